@@ -0,0 +1,148 @@
+"""
+Fingerprinted, precompressed static assets.
+
+`python assets.py` copies everything under static/css, static/js and
+static/assets into static/dist with a content hash in each filename, writes
+.br/.gz variants for compressible files and records the mapping in
+static/dist/manifest.json. At runtime `init_assets(app)` exposes an
+`asset_url()` template helper that points at the hashed copy and serves it
+with immutable cache headers, picking the smallest variant the browser
+accepts. Without a manifest (local development, tests) `asset_url()` falls
+back to Flask's regular static route.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; we still ship gzip variants without it
+    brotli = None
+
+STATIC_FOLDER = "static"
+ASSET_DIRS = ("css", "js", "assets")
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+
+HASH_LENGTH = 10
+ONE_YEAR = 365 * 24 * 60 * 60
+
+# Already-compressed formats (jpg, png, mp4...) gain nothing from another pass.
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".ico", ".json", ".txt", ".map"}
+
+# Accept-Encoding token -> file suffix, in order of preference.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+# -----------------------
+# BUILD STEP
+# -----------------------
+def fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(filename, file_hash):
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{file_hash}{ext}"
+
+
+def write_compressed_variants(path):
+    """Writes path.gz (and path.br when Brotli is installed) next to path."""
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build_assets(static_folder=STATIC_FOLDER):
+    """
+    Rebuilds static/dist from scratch and returns the manifest that maps
+    each logical filename (e.g. "css/styles.css") to its hashed copy.
+    """
+    dist_folder = os.path.join(static_folder, DIST_DIR)
+    if os.path.exists(dist_folder):
+        shutil.rmtree(dist_folder)
+
+    manifest = {}
+    for asset_dir in ASSET_DIRS:
+        for root, _, files in os.walk(os.path.join(static_folder, asset_dir)):
+            for name in sorted(files):
+                if name.startswith("."):
+                    continue
+                source = os.path.join(root, name)
+                logical = os.path.relpath(source, static_folder).replace(os.sep, "/")
+                target = hashed_name(logical, fingerprint(source))
+
+                target_path = os.path.join(dist_folder, target)
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                shutil.copyfile(source, target_path)
+                if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                    write_compressed_variants(target_path)
+                manifest[logical] = target
+
+    with open(os.path.join(dist_folder, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder=STATIC_FOLDER):
+    manifest_path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+# -----------------------
+# FLASK INTEGRATION
+# -----------------------
+def init_assets(app):
+    """Registers the `asset_url` template helper and the /dist route."""
+    dist_folder = os.path.join(app.static_folder, DIST_DIR)
+    app.extensions["asset_manifest"] = load_manifest(app.static_folder)
+
+    def asset_url(filename):
+        hashed = app.extensions["asset_manifest"].get(filename)
+        if hashed is None:
+            return url_for("static", filename=filename)
+        return url_for("hashed_asset", filename=hashed)
+
+    def hashed_asset(filename):
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        served_name, encoding = filename, None
+        for token, suffix in ENCODINGS:
+            if request.accept_encodings[token] and os.path.isfile(
+                os.path.join(dist_folder, filename + suffix)
+            ):
+                served_name, encoding = filename + suffix, token
+                break
+
+        response = send_from_directory(
+            dist_folder, served_name, mimetype=mimetype, max_age=ONE_YEAR
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Cache-Control"] = f"public, max-age={ONE_YEAR}, immutable"
+        response.vary.add("Accept-Encoding")
+        return response
+
+    app.add_url_rule("/dist/<path:filename>", "hashed_asset", hashed_asset)
+    app.add_template_global(asset_url)
+
+
+if __name__ == "__main__":
+    built = build_assets()
+    print(f"✅ Built {len(built)} fingerprinted assets into {STATIC_FOLDER}/{DIST_DIR}.")
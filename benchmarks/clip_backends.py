@@ -0,0 +1,138 @@
+"""
+Accuracy and throughput of the CPU CLIP backends against fp32 PyTorch.
+
+Embeds the frames of a synthetic video with every backend and thread count,
+reports frames per second, and checks that each backend ranks the frames
+like the fp32 model does for a set of prompts: the mean cosine similarity
+of the embeddings, the overlap of the top-k frames per prompt and the rank
+correlation of the full ordering. A backend whose top-k overlap falls below
+--min-overlap fails the run with exit code 1.
+
+    python benchmarks/clip_backends.py                          # openai/clip-vit-base-patch32
+    python benchmarks/clip_backends.py --backends torch int8 --threads 1 2 4
+    python benchmarks/clip_backends.py --model tiny             # stand-in model, no download
+
+The "tiny" model's text encoder is untrained, so its prompts are fixed
+random vectors and only the image encoder is compared.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import video_summarization as vs  # noqa: E402
+from benchmarks.synthetic import make_video  # noqa: E402
+
+PROMPTS = [
+    "a person talking to the camera",
+    "a crowd at a sports event",
+    "a car driving on a road",
+    "text on a slide",
+    "an animal outdoors",
+]
+
+
+def load_backend(model_name, backend, threads):
+    """Returns (clip_model, clip_proc, encode_prompts) for one backend."""
+    if model_name == "tiny":
+        from benchmarks.standins import TinyClipModel, TinyClipProcessor
+
+        model = vs.convert_clip(backend, clip_model=TinyClipModel(), threads=threads)
+        reference = TinyClipModel()
+
+        def encode_prompts(prompts):
+            return np.concatenate(
+                [reference.random_prompt_embedding(seed=i) for i in range(len(prompts))]
+            )
+
+        return model, TinyClipProcessor(), encode_prompts
+    models = vs.PipelineModels(device="cpu", clip_backend=backend, threads=threads)
+    return models.clip_model, models.clip_proc, models.encode_prompts
+
+
+def ranking_agreement(reference, scores, k):
+    """Mean top-k overlap and Spearman correlation over the prompt columns."""
+    overlaps, correlations = [], []
+    for ref_col, col in zip(reference.T, scores.T):
+        top_ref = set(np.argsort(-ref_col)[:k])
+        top = set(np.argsort(-col)[:k])
+        overlaps.append(len(top_ref & top) / k)
+        ref_rank = np.argsort(np.argsort(ref_col))
+        rank = np.argsort(np.argsort(col))
+        correlations.append(float(np.corrcoef(ref_rank, rank)[0, 1]))
+    return float(np.mean(overlaps)), float(np.mean(correlations))
+
+
+def run(model_name, backends, thread_counts, frames, prompts, k):
+    keyframes = [{"frame": frame} for frame, _ in frames]
+    rows, reference = [], None
+    for backend in backends:
+        for threads in thread_counts:
+            model, proc, encode_prompts = load_backend(model_name, backend, threads)
+            vs.clip_embed_keyframes(keyframes[:2], model, proc, "cpu")  # warm-up
+            start = time.perf_counter()
+            embeddings = vs.clip_embed_keyframes(keyframes, model, proc, "cpu")
+            elapsed = time.perf_counter() - start
+            scores = vs.prompt_scores(embeddings, encode_prompts(prompts))
+            if reference is None:
+                reference = embeddings, scores
+            cosine = float(np.mean(np.sum(embeddings * reference[0], axis=1)))
+            overlap, spearman = ranking_agreement(reference[1], scores, k)
+            rows.append(
+                {
+                    "backend": backend,
+                    "threads": threads,
+                    "frames_per_s": len(keyframes) / elapsed,
+                    "cosine": cosine,
+                    "topk_overlap": overlap,
+                    "spearman": spearman,
+                }
+            )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLIP backend accuracy and throughput.")
+    parser.add_argument("--model", default=vs.CLIP_MODEL_NAME, help='model name or "tiny"')
+    parser.add_argument("--backends", nargs="+", choices=vs.CLIP_BACKENDS, default=None)
+    parser.add_argument("--threads", nargs="+", type=int, default=[os.cpu_count() or 1])
+    parser.add_argument("--seconds", type=float, default=8, help="synthetic video length")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--min-overlap", type=float, default=0.8)
+    args = parser.parse_args()
+    # fp32 PyTorch comes first: it is the reference every backend is compared to.
+    backends = ["torch"] + [b for b in (args.backends or vs.CLIP_BACKENDS) if b != "torch"]
+
+    with tempfile.TemporaryDirectory(prefix="clip-backends-") as workdir:
+        video = make_video(os.path.join(workdir, "clip.mp4"), args.seconds, size=(640, 360))
+        frames, _ = vs.load_entire_video(video, resize_dim=vs.RESIZE_DIM)
+    rows = run(args.model, backends, args.threads, frames, PROMPTS, args.top_k)
+
+    base = {row["threads"]: row["frames_per_s"] for row in rows if row["backend"] == "torch"}
+    print(f"\n{len(frames)} frames, {len(PROMPTS)} prompts, top-{args.top_k}")
+    print("backend  threads  frames/s  speedup  cosine  top-k overlap  spearman")
+    failed = False
+    for row in rows:
+        speedup = row["frames_per_s"] / base[row["threads"]]
+        print(
+            f"{row['backend']:<8} {row['threads']:>7} {row['frames_per_s']:>9.1f} "
+            f"{speedup:>7.2f}x {row['cosine']:>7.4f} {row['topk_overlap']:>14.2f} "
+            f"{row['spearman']:>9.3f}"
+        )
+        failed |= row["topk_overlap"] < args.min_overlap
+    if failed:
+        print(f"❌ A backend's top-{args.top_k} overlap fell below {args.min_overlap}.")
+    else:
+        print("✅ Every backend ranks frames like fp32 PyTorch.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
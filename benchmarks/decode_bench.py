@@ -0,0 +1,105 @@
+"""
+Speedup of parallel video decoding over the serial load_entire_video.
+
+Decodes one synthetic video with 1, 2, 4 and 8 worker processes, checks
+that every run returns the same frames in the same order as the serial
+decode, and prints the median time and speedup for each worker count.
+
+    python benchmarks/decode_bench.py
+    python benchmarks/decode_bench.py --seconds 120 --size 1280 720 --workers 1 4
+
+Speedup is bounded by the number of cores: on a machine with fewer cores
+than workers, the extra processes only add overhead.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import video_summarization as vs  # noqa: E402
+from benchmarks.synthetic import make_video  # noqa: E402
+
+
+def decode(video_path, workers):
+    quiet = open(os.devnull, "w")
+    stdout, sys.stdout = sys.stdout, quiet
+    try:
+        start = time.perf_counter()
+        frames, _ = vs.load_entire_video(
+            video_path, resize_dim=vs.RESIZE_DIM, workers=workers
+        )
+        return frames, time.perf_counter() - start
+    finally:
+        sys.stdout = stdout
+        quiet.close()
+
+
+def same_frames(expected, frames):
+    return len(expected) == len(frames) and all(
+        idx_a == idx_b and np.array_equal(a, b)
+        for (a, idx_a), (b, idx_b) in zip(expected, frames)
+    )
+
+
+def run(video_path, worker_counts, repeat):
+    """Returns one {"workers", "seconds", "speedup", "identical"} row per worker count."""
+    reference, _ = decode(video_path, 1)
+    rows = []
+    for workers in worker_counts:
+        times = []
+        for _ in range(repeat):
+            frames, elapsed = decode(video_path, workers)
+            times.append(elapsed)
+        rows.append(
+            {
+                "workers": workers,
+                "seconds": statistics.median(times),
+                "identical": same_frames(reference, frames),
+            }
+        )
+        del frames
+    serial = rows[0]["seconds"]
+    for row in rows:
+        row["speedup"] = serial / row["seconds"]
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel decode benchmark.")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--size", nargs=2, type=int, default=[1280, 720])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="decode-bench-") as workdir:
+        video = make_video(
+            os.path.join(workdir, "long.mp4"), args.seconds, size=tuple(args.size)
+        )
+        rows = run(video, args.workers, args.repeat)
+
+    print(
+        f"\n{args.seconds:.0f}s {args.size[0]}x{args.size[1]} video, {os.cpu_count()} cores"
+    )
+    print("workers  seconds  speedup  frames match serial")
+    for row in rows:
+        print(
+            f"{row['workers']:>7} {row['seconds']:>8.3f} {row['speedup']:>7.2f}x "
+            f"{'yes' if row['identical'] else 'NO'}"
+        )
+    if not all(row["identical"] for row in rows):
+        print("❌ Parallel decode returned different frames.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
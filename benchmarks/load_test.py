@@ -0,0 +1,123 @@
+"""
+Local load test: page latency while uploads are in flight.
+
+Starts the app on a threaded local server with a fake pipeline that sleeps
+for --pipeline-seconds (standing in for the Kaggle/Selenium round trip),
+measures GET latency on a page with no uploads running, then again while
+--uploads uploads are being processed, and prints both distributions.
+
+    python benchmarks/load_test.py --uploads 8 --pipeline-seconds 10
+"""
+
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+from main import create_app, db, User  # noqa: E402
+
+
+def fake_pipeline(seconds):
+    def run(filepath):
+        time.sleep(seconds)
+        return None
+
+    return run
+
+
+def measure(client, path, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize(label, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{label:<28} p50={statistics.median(latencies):7.1f} ms  "
+        f"p95={p95:7.1f} ms  max={latencies[-1]:7.1f} ms"
+    )
+    return statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--pipeline-seconds", type=float, default=10.0)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--path", default="/about")
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'load.db')}",
+            "UPLOAD_FOLDER": workdir,
+            "PIPELINE_RUNNER": fake_pipeline(args.pipeline_seconds),
+            "WTF_CSRF_ENABLED": False,
+        }
+    )
+    with app.app_context():
+        db.session.add(User(email="load@example.com", password="x", name="Load"))
+        db.session.commit()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", args.port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{args.port}"
+
+    def logged_in_session():
+        session = requests.Session()
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess["_user_id"] = "1"
+                sess["_fresh"] = True
+            client.get("/about")
+            cookie = client.get_cookie("session")
+        session.cookies.set("session", cookie.value)
+        return session
+
+    reader = requests.Session()
+    measure(reader, base + args.path, 5)  # warm up templates and connections
+    idle = summarize("idle", measure(reader, base + args.path, args.requests))
+
+    uploader = logged_in_session()
+    started = time.perf_counter()
+    jobs = []
+    for i in range(args.uploads):
+        response = uploader.post(
+            base + "/upload",
+            files={"file": (f"load_{i}.mp4", io.BytesIO(b"\0" * 1024), "video/mp4")},
+        )
+        jobs.append(response.json())
+    accepted_ms = (time.perf_counter() - started) * 1000
+    print(f"{args.uploads} uploads accepted in {accepted_ms:.1f} ms")
+
+    busy = summarize(
+        f"with {args.uploads} uploads in flight",
+        measure(reader, base + args.path, args.requests),
+    )
+
+    statuses = [uploader.get(base + job["status_url"]).json()["status"] for job in jobs]
+    print("job states while measuring:", {s: statuses.count(s) for s in set(statuses)})
+    print(f"median slowdown: {busy / idle:.2f}x")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Reproducible per-stage benchmark of the summarization pipeline.
+
+Generates synthetic videos at several lengths and resolutions, times each
+frame-level stage of video_summarization.py on CPU (CLIP scoring uses the
+tiny stand-in model from benchmarks/standins.py) and compares the medians
+against benchmarks/baseline.json. A stage that is more than --tolerance
+slower than its baseline fails the run with exit code 1.
+
+    python benchmarks/pipeline_bench.py                    # compare to baseline
+    python benchmarks/pipeline_bench.py --update-baseline  # record a new baseline
+    python benchmarks/pipeline_bench.py --cases short-360p --repeat 1
+
+Baselines are machine-specific: record one on the machine that runs the check.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import video_summarization as vs  # noqa: E402
+from benchmarks.synthetic import make_video  # noqa: E402
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# name -> (seconds, source resolution)
+CASES = {
+    "short-360p": (4, (640, 360)),
+    "medium-360p": (12, (640, 360)),
+    "long-360p": (30, (640, 360)),
+    "short-720p": (4, (1280, 720)),
+}
+RESIZE_DIM = (640, 360)  # what VideoSummarizer uses
+SNIPPET_HALF_WIDTH = 7
+MAX_SNIPPETS = 10
+
+# Differences below this many seconds are noise, whatever the ratio.
+MIN_REGRESSION_S = 0.05
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_case(video_path, workdir, keyframe_mode="dynamic", counts=None):
+    """
+    Runs every stage once and returns {stage: seconds}. Pass a dict as
+    `counts` to also get the number of decoded frames and of keyframes scored.
+    """
+    timings = {}
+    counts = {} if counts is None else counts
+    quiet = open(os.devnull, "w")
+    # The stages print progress lines and tqdm bars; keep the report readable.
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = quiet
+    try:
+        (frames, fps), timings["load_entire_video"] = timed(
+            vs.load_entire_video, video_path, resize_dim=RESIZE_DIM
+        )
+        if keyframe_mode == "shots":
+            (keyframes, _), timings["shot_segmentation"] = timed(vs.shot_keyframes, frames)
+        else:
+            keyframes, timings["dynamic_extraction"] = timed(
+                vs.dynamic_extraction_in_memory, frames, pixel_thresh=30, min_interval=10
+            )
+        counts.update(frames=len(frames), keyframes=len(keyframes))
+
+        try:
+            from benchmarks.standins import TinyClipModel, TinyClipProcessor
+        except ImportError:  # torch not installed: score frames with random embeddings
+            TinyClipModel = None
+        if TinyClipModel is not None:
+            model, processor = TinyClipModel(), TinyClipProcessor()
+            keyframes, timings["clip_scoring"] = timed(
+                vs.clip_score_keyframes,
+                keyframes,
+                model.random_prompt_embedding(),
+                model,
+                processor,
+                "cpu",
+            )
+        else:
+            import numpy as np
+
+            rng = np.random.default_rng(0)
+            for kf in keyframes:
+                emb = rng.normal(size=64)
+                kf["clip_emb"] = emb / np.linalg.norm(emb)
+                kf["clip_score"] = float(rng.random())
+
+        chosen, timings["diversity_skip"] = timed(vs.diversity_skip, keyframes, threshold_dot=0.98)
+        chosen = sorted(chosen[:MAX_SNIPPETS], key=lambda kf: kf["real_index"])
+
+        motion_s = write_s = 0.0
+        for i, kf in enumerate(chosen):
+            start = max(0, kf["real_index"] - SNIPPET_HALF_WIDTH)
+            end = min(len(frames) - 1, kf["real_index"] + SNIPPET_HALF_WIDTH)
+            snippet = vs.generate_snippet(frames, start, end)
+            _, elapsed = timed(vs.measure_local_motion_snippet, snippet, resize_dim=RESIZE_DIM)
+            motion_s += elapsed
+            out_path = os.path.join(workdir, f"snippet_{i:03d}.mp4")
+            _, elapsed = timed(vs.write_snippet_video, out_path, snippet, fps, RESIZE_DIM)
+            write_s += elapsed
+        timings["motion_measurement"] = motion_s
+        timings["snippet_writing"] = write_s
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+        quiet.close()
+    return timings
+
+
+def benchmark(case_names, repeat, workdir):
+    results = {}
+    for name in case_names:
+        seconds, size = CASES[name]
+        video_path = make_video(os.path.join(workdir, f"{name}.mp4"), seconds, size=size)
+        runs = [run_case(video_path, workdir) for _ in range(repeat)]
+        results[name] = {
+            stage: round(statistics.median(run[stage] for run in runs), 6) for stage in runs[0]
+        }
+        print(f"[{name}] " + "  ".join(f"{k}={v:.4f}s" for k, v in results[name].items()))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of human-readable regression messages."""
+    regressions = []
+    for case, stages in results.items():
+        for stage, seconds in stages.items():
+            base = baseline.get(case, {}).get(stage)
+            if base is None:
+                continue
+            if seconds > base * (1 + tolerance) and seconds - base > MIN_REGRESSION_S:
+                regressions.append(
+                    f"{case}/{stage}: {seconds:.4f}s vs baseline {base:.4f}s "
+                    f"(+{(seconds / base - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmark.")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown ratio")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="pipeline-bench-") as workdir:
+        results = benchmark(args.cases, args.repeat, workdir)
+
+    if args.update_baseline:
+        existing = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                existing = json.load(f).get("results", {})
+        existing.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {
+                    "machine": {
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "cpus": os.cpu_count(),
+                    },
+                    "results": existing,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+        print(f"✅ Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --update-baseline first.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print("❌ Regression:", line)
+    if not regressions:
+        print("✅ All stages within tolerance of the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
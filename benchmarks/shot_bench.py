@@ -0,0 +1,76 @@
+"""
+Frames scored and end-to-end time with shot segmentation vs dynamic extraction.
+
+Runs the frame-level pipeline of benchmarks/pipeline_bench.py on long
+synthetic videos twice, once selecting keyframes with
+dynamic_extraction_in_memory and once with shot_keyframes, and reports how
+many frames reach CLIP scoring and how long the whole run takes.
+
+    python benchmarks/shot_bench.py
+    python benchmarks/shot_bench.py --seconds 300 --shots 40 --repeat 1
+
+CLIP scoring uses the tiny stand-in model, so the real-CLIP speedup is
+larger: there, scoring dominates and shrinks with the number of frames.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.pipeline_bench import run_case  # noqa: E402
+from benchmarks.synthetic import make_video  # noqa: E402
+
+MODES = ("dynamic", "shots")
+
+
+def run(video_path, workdir, repeat):
+    """Returns {mode: {"frames", "keyframes", "total_s", "scoring_s"}}."""
+    results = {}
+    for mode in MODES:
+        totals, scoring, counts = [], [], {}
+        for _ in range(repeat):
+            timings = run_case(video_path, workdir, keyframe_mode=mode, counts=counts)
+            totals.append(sum(timings.values()))
+            scoring.append(timings.get("clip_scoring", 0.0))
+        results[mode] = {
+            "frames": counts["frames"],
+            "keyframes": counts["keyframes"],
+            "total_s": statistics.median(totals),
+            "scoring_s": statistics.median(scoring),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shot segmentation benchmark.")
+    parser.add_argument("--seconds", nargs="+", type=float, default=[60, 180])
+    parser.add_argument("--shots", type=int, default=None, help="default: one per 8 seconds")
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    print("video   mode     frames  scored  reduction  scoring_s  total_s  speedup")
+    with tempfile.TemporaryDirectory(prefix="shot-bench-") as workdir:
+        for seconds in args.seconds:
+            shots = args.shots or max(1, int(seconds // 8))
+            video = make_video(
+                os.path.join(workdir, f"long-{seconds:.0f}s.mp4"), seconds, shots=shots
+            )
+            results = run(video, workdir, args.repeat)
+            base = results["dynamic"]
+            for mode, row in results.items():
+                print(
+                    f"{seconds:>4.0f}s  {mode:<8} {row['frames']:>6} {row['keyframes']:>7} "
+                    f"{base['keyframes'] / max(row['keyframes'], 1):>9.1f}x "
+                    f"{row['scoring_s']:>10.3f} {row['total_s']:>8.3f} "
+                    f"{base['total_s'] / row['total_s']:>7.2f}x"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Tiny CPU stand-ins for the CLIP model and processor.
+
+They expose the same calls the pipeline makes (`processor(images=...,
+return_tensors="pt").to(device)`, `model.get_image_features(**inputs)`,
+`model.get_text_features(input_ids, attention_mask)`), so benchmarks and
+tests exercise the real scoring loop and exporters without downloading weights.
+"""
+
+import cv2
+import numpy as np
+import torch
+
+
+class _Batch(dict):
+    def to(self, device):
+        return _Batch({key: value.to(device) for key, value in self.items()})
+
+
+class TinyClipProcessor:
+    def __init__(self, image_size=224):
+        self.image_size = image_size
+
+    def __call__(self, images=None, return_tensors="pt", **kwargs):
+        frames = images if isinstance(images, list) else [images]
+        batch = np.stack(
+            [cv2.resize(frame, (self.image_size, self.image_size)) for frame in frames]
+        )
+        pixels = torch.from_numpy(batch).permute(0, 3, 1, 2).float() / 255.0
+        return _Batch(pixel_values=pixels)
+
+
+class TinyClipModel(torch.nn.Module):
+    def __init__(self, dim=64, seed=0):
+        super().__init__()
+        torch.manual_seed(seed)
+        self.dim = dim
+        self.patch = torch.nn.Conv2d(3, dim, kernel_size=16, stride=16)
+        self.proj = torch.nn.Linear(dim, dim)
+        self.tokens = torch.nn.Embedding(1000, dim)
+
+    def get_image_features(self, pixel_values):
+        return self.proj(self.patch(pixel_values).mean(dim=(2, 3)))
+
+    def get_text_features(self, input_ids, attention_mask):
+        mask = attention_mask.unsqueeze(-1).float()
+        pooled = (self.tokens(input_ids) * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        return self.proj(pooled)
+
+    def random_prompt_embedding(self, seed=1):
+        generator = torch.Generator().manual_seed(seed)
+        emb = torch.randn(1, self.dim, generator=generator)
+        return torch.nn.functional.normalize(emb, p=2, dim=1).numpy()
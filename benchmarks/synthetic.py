@@ -0,0 +1,74 @@
+"""
+Synthetic test videos for the benchmarks.
+
+Videos are drawn with OpenCV: each shot has its own background colour and a
+few shapes moving at different speeds, so frame differencing, optical flow
+and shot detection all have something real to work with. A matching sine
+tone is written next to the video as a .wav; when ffmpeg is on PATH it is
+also muxed into the .mp4 so Whisper-style audio extraction works.
+"""
+
+import math
+import os
+import shutil
+import struct
+import subprocess
+import wave
+
+import cv2
+import numpy as np
+
+
+def make_video(path, seconds, size=(640, 360), fps=24, shots=4, seed=0):
+    """Writes a synthetic .mp4 of `seconds` length and returns its path."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    total = int(seconds * fps)
+    shot_length = max(1, total // max(1, shots))
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+
+    for idx in range(total):
+        shot = idx // shot_length
+        shot_rng = np.random.default_rng(seed * 1000 + shot)
+        background = tuple(int(c) for c in shot_rng.integers(20, 235, size=3))
+        frame = np.full((height, width, 3), background, dtype=np.uint8)
+
+        t = (idx % shot_length) / fps
+        for k in range(3):
+            speed = 40 + 60 * k
+            cx = int((width * 0.2 + speed * t * (k + 1)) % width)
+            cy = int(height / 2 + math.sin(t * (k + 1)) * height / 4)
+            color = tuple(int(c) for c in shot_rng.integers(0, 255, size=3))
+            cv2.circle(frame, (cx, cy), 20 + 10 * k, color, -1)
+        x0 = int((t * 90) % width)
+        cv2.rectangle(frame, (x0, 20), (x0 + width // 8, 20 + height // 6), (255, 255, 255), -1)
+        # Light sensor noise so consecutive frames are never byte-identical.
+        noise = rng.integers(0, 6, size=frame.shape, dtype=np.uint8)
+        writer.write(cv2.add(frame, noise))
+    writer.release()
+
+    audio_path = os.path.splitext(path)[0] + ".wav"
+    write_tone(audio_path, seconds)
+    if shutil.which("ffmpeg"):
+        muxed = path + ".muxed.mp4"
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", path, "-i", audio_path,
+             "-c:v", "copy", "-c:a", "aac", "-shortest", muxed],
+            check=True,
+        )
+        os.replace(muxed, path)
+    return path
+
+
+def write_tone(path, seconds, sample_rate=16000, frequency=440.0):
+    """Writes a mono 16-bit sine tone whose pitch steps up once a second."""
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        samples = bytearray()
+        for i in range(int(seconds * sample_rate)):
+            freq = frequency * (1 + (i // sample_rate) % 4 * 0.25)
+            samples += struct.pack("<h", int(8000 * math.sin(2 * math.pi * freq * i / sample_rate)))
+        wav.writeframes(bytes(samples))
+    return path
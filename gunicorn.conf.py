@@ -0,0 +1,28 @@
+"""
+Gunicorn settings for `gunicorn "main:create_app()"`.
+
+Long-running upload work runs on the app's background job pool, so request
+threads only ever do short work. The default gthread worker serves many
+requests per process without extra dependencies; set WEB_WORKER_CLASS=gevent
+(after `pip install gevent`) for an evented worker instead. The gevent
+worker loads the app after monkey-patching instead of preloading it.
+
+The Kaggle session (Selenium driver, upload counter, upload queue) lives in
+the process, so run one worker and scale with threads. A second worker would
+log into Kaggle on its own and race the first on dataset versions and
+notebook runs.
+"""
+
+import os
+
+worker_class = os.getenv("WEB_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+threads = int(os.getenv("WEB_THREADS", 8))  # gthread only
+worker_connections = int(os.getenv("WEB_CONNECTIONS", 1000))  # gevent only
+
+# Build the app once in the master; workers fork from it. Not with gevent:
+# the master would import main.py (threading, concurrent.futures and the job
+# pool's locks) before the worker monkey-patches them.
+preload_app = worker_class != "gevent"
+timeout = int(os.getenv("WEB_TIMEOUT", 120))
+keepalive = 5
@@ -1,10 +1,16 @@
 import os
 import subprocess
 import shutil
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from flask import (
+    Blueprint,
     Flask,
     abort,
+    current_app,
     render_template,
     redirect,
     url_for,
@@ -14,37 +20,48 @@ from flask import (
 )
 from flask_bootstrap import Bootstrap4
 from flask_ckeditor import CKEditor
-from flask_gravatar import Gravatar
 from flask_login import UserMixin, login_user, LoginManager, current_user, logout_user
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import relationship, DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import Integer, String, Text
+from sqlalchemy.orm import (
+    relationship,
+    DeclarativeBase,
+    Mapped,
+    mapped_column,
+    selectinload,
+)
+from sqlalchemy import Float, Integer, String, Text
+from sqlalchemy.pool import StaticPool
 from functools import wraps
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 
 # Import your forms from the forms.py
 from forms import CreatePostForm, RegisterForm, LoginForm, CommentForm
+from search import SearchIndex
+from assets import init_assets
+from avatars import Avatars
+from metrics import (
+    UPLOAD_STEP_LATENCY,
+    StepTrace,
+    init_metrics,
+    record_pipeline_trace,
+)
 from dotenv import load_dotenv
 
-load_dotenv()  # Load environment variables from .env file
-
-app = Flask(__name__)
-app.config["SECRET_KEY"] = os.getenv("FLASK_KEY")
-app.secret_key = os.getenv("FLASK_SECRET_KEY", "your_secret_key_here")  # Keep this secret
-
-ckeditor = CKEditor(app)
-Bootstrap4(app)
+# Extensions are created unbound and attached to an app in create_app(), so
+# importing this module is cheap and has no side effects. Selenium and
+# undetected_chromedriver are only imported inside the routes that drive them.
+ckeditor = CKEditor()
+bootstrap = Bootstrap4()
 
 # Configure Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
+
+bp = Blueprint("blog", __name__)
 
 UPLOAD_FOLDER = "static/uploads"
 ALLOWED_EXTENSIONS = {"mp4", "avi", "mov"}
 
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -55,19 +72,6 @@ def load_user(user_id):
     return db.get_or_404(User, user_id)
 
 
-# For adding profile images to the comment section
-gravatar = Gravatar(
-    app,
-    size=100,
-    rating="g",
-    default="retro",
-    force_default=False,
-    force_lower=False,
-    use_ssl=False,
-    base_url=None,
-)
-
-
 # -----------------------
 # DATABASE SETUP
 # -----------------------
@@ -75,9 +79,7 @@ class Base(DeclarativeBase):
     pass
 
 
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DB_URI", "sqlite:///posts.db")
 db = SQLAlchemy(model_class=Base)
-db.init_app(app)
 
 
 # -----------------------
@@ -116,8 +118,37 @@ class Comment(db.Model):
     parent_post = relationship("BlogPost", back_populates="comments")
 
 
-with app.app_context():
-    db.create_all()
+class VideoSummary(db.Model):
+    __tablename__ = "video_summaries"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    filename: Mapped[str] = mapped_column(String(250), nullable=False)
+    summary: Mapped[str] = mapped_column(Text, nullable=False)
+    date: Mapped[str] = mapped_column(String(250), nullable=False)
+
+
+class UploadJob(db.Model):
+    __tablename__ = "upload_jobs"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    filename: Mapped[str] = mapped_column(String(250), nullable=False)
+    # queued -> running -> waiting (for the Kaggle callback) -> summarizing -> done | failed
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    summary: Mapped[str] = mapped_column(Text, nullable=True)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+    # JSON: {"app": [spans recorded here], "pipeline": trace posted by the notebook}
+    trace: Mapped[str] = mapped_column(Text, nullable=True)
+    date: Mapped[str] = mapped_column(String(250), nullable=False)
+    # Unix time of the last status change, used to expire stale "waiting" jobs.
+    updated_at: Mapped[float] = mapped_column(Float, nullable=True)
+
+
+# -----------------------
+# SEARCH INDEX
+# -----------------------
+search_index = SearchIndex(db)
+search_index.watch(BlogPost, "post", lambda post: (post.title, post.subtitle, post.body))
+search_index.watch(
+    VideoSummary, "summary", lambda summary: (summary.filename, "", summary.summary)
+)
 
 
 # -----------------------
@@ -136,7 +167,7 @@ def admin_only(f):
 # -----------------------
 # ROUTES
 # -----------------------
-@app.route("/register", methods=["GET", "POST"])
+@bp.route("/register", methods=["GET", "POST"])
 def register():
     form = RegisterForm()
     if form.validate_on_submit():
@@ -146,7 +177,7 @@ def register():
         user = result.scalar()
         if user:
             flash("You've already signed up with that email, log in instead!")
-            return redirect(url_for("login"))
+            return redirect(url_for("blog.login"))
 
         hash_and_salted_password = generate_password_hash(
             form.password.data, method="pbkdf2:sha256", salt_length=8
@@ -159,7 +190,7 @@ def register():
         db.session.add(new_user)
         db.session.commit()
         login_user(new_user)
-        return redirect(url_for("get_all_posts"))
+        return redirect(url_for("blog.get_all_posts"))
     return render_template("register.html", form=form, current_user=current_user)
 
 
@@ -168,11 +199,8 @@ KAGGLE_DATASET_FOLDER = os.path.join(os.getcwd(), "kaggle_dataset_folder")
 
 # # 2) Folder containing your .ipynb + kernel-metadata.json:
 # KAGGLE_KERNEL_FOLDER = os.path.join(os.getcwd(), "")
-chatgpt_driver = None
 global_driver = None
 upload_counter = 0  # 0 means first upload
-final_summary = None
-# Global variable for the ChatGPT driver
 
 
 def update_kaggle_dataset(video_file_path):
@@ -356,7 +384,367 @@ def run_kaggle_notebook_selenium():
     return True
 
 
-@app.route("/upload", methods=["GET", "POST"])
+def summarize_with_chatgpt(output):
+    """
+    Sends the Kaggle snippet summaries to ChatGPT through Selenium and
+    returns the combined summary text.
+    """
+    final_prompt = (f"Here are my snippet summaries: {output} "
+                    f"Please combine these snippets into one cohesive summary.")
+
+    import undetected_chromedriver as uc
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    import time
+
+    print("Initializing ChatGPT driver and performing login...")
+    chrome_options = uc.ChromeOptions()
+    # chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-background-timer-throttling")
+    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+    chrome_options.add_argument("--disable-renderer-backgrounding")
+    chatgpt_driver = uc.Chrome(options=chrome_options)
+    chatgpt_driver.get("https://chatgpt.com")
+
+    # time.sleep(random.uniform(2, 4))
+    #
+    # # Perform login steps...
+    # # LOGIN_BTN = (By.CSS_SELECTOR, '[data-testid="login-button"]')
+    # # WebDriverWait(chatgpt_driver, 20).until(EC.element_to_be_clickable(LOGIN_BTN)).click()
+    # login_btn = chatgpt_driver.find_element(By.CSS_SELECTOR, '[data-testid="login-button"]')
+    #
+    # # Create an ActionChains instance
+    # actions = ActionChains(chatgpt_driver)
+    #
+    # # Move to the element, pause, then click it
+    # actions.move_to_element(login_btn).pause(random.uniform(0.5, 1
+    # .5)).click(login_btn).perform()
+    # # EMAIL_INPUT = (By.CSS_SELECTOR, '[id="email-input"]')
+    # # WebDriverWait(chatgpt_driver, 20
+    # ).until(EC.element_to_be_clickable(EMAIL_INPUT)).send_keys(
+    # #     os.getenv("CHATGPT_EMAIL", ""))
+    #
+    # # NEXTBUTTON = (By.CSS_SELECTOR, 'input.continue-btn')
+    # # WebDriverWait(chatgpt_driver, 20).until(EC.element_to_be_clickable(NEXTBUTTON)).click()
+    # time.sleep(random.uniform(2, 4))
+    #
+    # EMAIL_INPUT = (By.CSS_SELECTOR, '[id="email-input"]')
+    # email_input_elem = WebDriverWait(chatgpt_driver, 20
+    # ).until(EC.element_to_be_clickable(EMAIL_INPUT))
+    # actions.move_to_element(email_input_elem).pause(random.uniform(0.5, 1.0)).send_keys(
+    #     os.getenv("CHATGPT_EMAIL", "")).perform()
+    #
+    # # # Wait until at least one Next button is present
+    # # WebDriverWait(chatgpt_driver, 15).until(
+    # #     EC.presence_of_element_located((By.CSS_SELECTOR, '[jsname="V67aGc"]'))
+    # # )
+    # # time.sleep(random.uniform(2, 4))
+    #
+    # buttons = chatgpt_driver.find_elements(By.CSS_SELECTOR, '.continue-btn')
+    # found = False
+    # for btn in buttons:
+    #     btn_value = btn.get_attribute("value")
+    #     print("Found button with value:", btn_value)
+    #     if btn_value and btn_value.strip().lower() == "continue":
+    #         found = True
+    #         print("Button location:", btn.location)
+    #         print("Button size:", btn.size)
+    #         if btn.is_displayed():
+    #             print("Button is displayed.")
+    #         else:
+    #             print("Button is NOT displayed.")
+    #
+    #         try:
+    #             actions = ActionChains(chatgpt_driver)
+    #             actions.move_to_element(btn).pause(ran
+    #             dom.uniform(0.5, 1.5)).click(btn).perform()
+    #             print("Button clicked successfully.")
+    #         except Exception as e:
+    #             print("Failed to click button:", str(e))
+    #         break
+    #
+    # if not found:
+    #     print("No button with value 'Continue' found.")
+    #
+    # captcha_locator = (By.CSS_SELECTOR, '.captcha-overlay')
+    #
+    # try:
+    #     # Wait up to 60 seconds for the captcha overlay to vanish.
+    #     WebDriverWait(chatgpt_driver, 120).until(
+    #         EC.invisibility_of_element_located(captcha_locator)
+    #     )
+    #     print("Captcha has disappeared.")
+    # except TimeoutException:
+    #     print("Captcha did not disappear within 60 seconds. Proceeding anyway.")
+    # try:
+    #     # Wait for the password input field to be visible
+    #     password_input = WebDriverWait(chatgpt_driver, 40).until(
+    #         EC.visibility_of_element_located((By.CSS_SELECTOR, "input#password"))
+    #     )
+    #     password_input.send_keys(os.getenv("CHATGPT_PASSWORD", ""))
+    #     print("Password typed successfully.")
+    # except TimeoutException:
+    #     print("Timeout waiting for password input field to become visible.")
+    #
+    # # # Now wait for the actual password input to become visible.
+    # # # Often it might be an <input> with type="password".
+    # # password_input = WebDriverWait(chatgpt_driver, 20).until(
+    # #     EC.visibility_of_element_located((By.CSS_SELECTOR, "input[type='password']"))
+    # # )
+    # # password_input.send_keys(os.getenv("CHATGPT_PASSWORD", ""))
+    # # print("Password typed successfully.")
+    # # Define the PASSWORD locator
+    # # PASSWORD = (By.CSS_SELECTOR, '[id="password"]')
+    # #
+    # # # Increase wait time if needed (e.g., 40 seconds instead of 20)
+    # # try:
+    # #     print("Waiting for the password field to become clickable...")
+    # #     password_elem = WebDriverWait(chatgpt_driver, 40).until(
+    # #         EC.element_to_be_clickable(PASSWORD)
+    # #     )
+    # #     print("Password field is clickable. Typing password...")
+    # #     password_elem.send_keys(os.getenv("CHATGPT_PASSWORD", ""))
+    # #     print("Password typed successfully.")
+    # # except TimeoutException as e:
+    # #     print("Timeout waiting for password field to be clickable.")
+    # #     # Optionally, try to check if the element exists:
+    # #     elems = chatgpt_driver.find_elements(By.CSS_SELECTOR, '[id="password"]')
+    # #     if elems:
+    # #         print("Found password field elements:", len(elems))
+    # #     else:
+    # #         print("No password field element found.")
+    # #     # As a fallback, you can try clicking via JavaScript if needed:
+    # #     try:
+    # #         if elems:
+    # #             chatgpt_driver.execute_script("arguments[0].click();", elems[0])
+    # #             elems[0].send_keys("")
+    # #             print("Password typed via JavaScript click fallback.")
+    # #     except Exception as js_e:
+    # #         print("Fallback method also failed:", str(js_e))
+    # # PASSWORD = (By.CSS_SELECTOR, '[id="password"]')
+    # # WebDriverWait(chatgpt_driver, 20).until(EC.element_to_be_cli
+    # ckable(PASSWORD)).send_keys("")
+    #
+    # SUBMIT = (By.CSS_SELECTOR, '[name="action"]')
+    # WebDriverWait(chatgpt_driver, 20).until(EC.element_to_be_clickable(SUBMIT)).click()
+    #
+    # REASON = (By.CSS_SELECTOR, '[aria-label="Reason"]')
+    # WebDriverWait(chatgpt_driver, 10).until(EC.element_to_be_clickable(REASON)).click()
+    # print("ChatGPT driver initialized and logged in.")
+
+    # driver = chatgpt_driver
+    # driver.get("https://chatgpt.com/")
+
+    CHAT_BOX = (By.CSS_SELECTOR, '[data-placeholder="Ask anything"]')
+    WebDriverWait(chatgpt_driver, 20).until(
+        EC.element_to_be_clickable(CHAT_BOX)
+    ).send_keys(final_prompt)
+
+    SEND_BTN = (By.CSS_SELECTOR, '[data-testid="send-button"]')
+    WebDriverWait(chatgpt_driver, 20).until(
+        EC.element_to_be_clickable(SEND_BTN)
+    ).click()
+    time.sleep(10)
+    RESPONSE_LOCATOR = (
+        By.CSS_SELECTOR,
+        '[class="markdown prose w-full break-words dark:prose-invert dark"]',
+    )
+    output_element = WebDriverWait(chatgpt_driver, 30).until(
+        EC.presence_of_element_located(RESPONSE_LOCATOR)
+    )
+    final_summary = output_element.text
+    print("Final Combined Summary:", final_summary)
+    chatgpt_driver.quit()
+    return final_summary
+
+
+def run_kaggle_pipeline(video_file_path):
+    """
+    Pushes the video to the Kaggle dataset and (re)runs the notebook.
+    Returns an error message, or None once the notebook run was triggered.
+    """
+    global upload_counter
+
+    # Step 1: Update Kaggle dataset
+    with UPLOAD_STEP_LATENCY.time(step="kaggle_dataset_update"):
+        dataset_success = update_kaggle_dataset(video_file_path)
+    if not dataset_success:
+        return "Dataset update failed."
+    # Step 2: Run or refresh the Kaggle notebook via Selenium
+    with UPLOAD_STEP_LATENCY.time(step="kaggle_notebook_trigger"):
+        kernel_success = run_kaggle_notebook_selenium()
+    upload_counter += 1
+    if not kernel_success:
+        return "Kaggle notebook run failed or did not complete."
+    return None
+
+
+# -----------------------
+# BACKGROUND JOBS
+# -----------------------
+# Uploads and Kaggle callbacks hand their slow work (Kaggle CLI, Selenium,
+# ChatGPT) to a small thread pool and return immediately; the browser polls
+# /upload/status/<job_id>. Job state lives in the database so any worker can
+# answer a status request. The pools are created lazily, after gunicorn forks.
+# Only one upload at a time may drive the shared Kaggle notebook session, so
+# uploads queue on their own single-thread pool instead of holding job threads
+# that callbacks need to finish summaries.
+JOB_THREADS = int(os.getenv("JOB_THREADS", 4))
+# A job still waiting on the notebook after this long is marked failed, so the
+# upload page stops polling it.
+KAGGLE_WAIT_TIMEOUT = float(os.getenv("KAGGLE_WAIT_TIMEOUT", 3 * 60 * 60))
+POOL_SIZES = {"job": JOB_THREADS, "kaggle": 1}
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def get_executor(pool="job"):
+    with _executor_lock:
+        if pool not in _executors:
+            _executors[pool] = ThreadPoolExecutor(
+                max_workers=POOL_SIZES[pool], thread_name_prefix=pool
+            )
+        return _executors[pool]
+
+
+def submit_job(fn, *args, pool="job"):
+    """Runs fn(*args) on the given pool inside an app context."""
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            fn(*args)
+
+    return get_executor(pool).submit(run)
+
+
+def update_job(job_id, **fields):
+    job = db.session.get(UploadJob, job_id)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.updated_at = time.time()
+    db.session.commit()
+    return job
+
+
+def expire_waiting_jobs():
+    """Fails jobs the notebook never called back for within KAGGLE_WAIT_TIMEOUT."""
+    timeout = current_app.config.get("KAGGLE_WAIT_TIMEOUT", KAGGLE_WAIT_TIMEOUT)
+    now = time.time()
+    db.session.execute(
+        db.update(UploadJob)
+        .where(UploadJob.status == "waiting", UploadJob.updated_at < now - timeout)
+        .values(
+            status="failed",
+            error="The Kaggle notebook never sent its output back.",
+            updated_at=now,
+        )
+    )
+    db.session.commit()
+
+
+def load_trace(job):
+    return json.loads(job.trace) if job.trace else {"app": [], "pipeline": None}
+
+
+def save_app_spans(job_id, step_trace):
+    job = db.session.get(UploadJob, job_id)
+    trace = load_trace(job)
+    trace["app"] = step_trace.spans
+    job.trace = json.dumps(trace)
+    db.session.commit()
+
+
+def process_upload(job_id, filepath, queued_at):
+    runner = current_app.config.get("PIPELINE_RUNNER", run_kaggle_pipeline)
+    step_trace = StepTrace()
+    step_trace.record("wait_for_kaggle", queued_at, time.time() - queued_at)
+    try:
+        update_job(job_id, status="running")
+        with step_trace.span("pipeline_trigger"):
+            error = runner(filepath)
+    except Exception as e:
+        error = str(e)
+    save_app_spans(job_id, step_trace)
+    if error:
+        print(f"❌ Upload job {job_id} failed:", error)
+        update_job(job_id, status="failed", error=error)
+    else:
+        # The Kaggle notebook POSTs its output back to /upload when it is done.
+        update_job(job_id, status="waiting")
+
+
+def finish_summary(job_id, output):
+    combiner = current_app.config.get("SUMMARY_COMBINER", summarize_with_chatgpt)
+    step_trace = StepTrace(load_trace(db.session.get(UploadJob, job_id))["app"])
+    try:
+        with step_trace.span("combine_summary"):
+            summary = combiner(output)
+    except Exception as e:
+        save_app_spans(job_id, step_trace)
+        print(f"❌ Summary job {job_id} failed:", str(e))
+        update_job(job_id, status="failed", error=str(e))
+        return
+    save_app_spans(job_id, step_trace)
+    # Store the summary and mark the job done in one commit, so a client that
+    # sees "done" can immediately find the summary through search.
+    job = db.session.get(UploadJob, job_id)
+    job.status = "done"
+    job.summary = summary
+    job.updated_at = time.time()
+    db.session.add(
+        VideoSummary(
+            filename=job.filename,
+            summary=summary,
+            date=date.today().strftime("%B %d, %Y"),
+        )
+    )
+    db.session.commit()
+
+
+def claim_waiting_job(filename):
+    """
+    Moves the oldest job waiting on the notebook for `filename` to
+    "summarizing" and returns it, or None if there is none. The conditional
+    UPDATE lets only one of two concurrent callbacks claim a job.
+    """
+    while True:
+        job_id = db.session.execute(
+            db.select(UploadJob.id)
+            .where(UploadJob.status == "waiting", UploadJob.filename == filename)
+            .order_by(UploadJob.id)
+            .limit(1)
+        ).scalar()
+        if job_id is None:
+            return None
+        claimed = db.session.execute(
+            db.update(UploadJob)
+            .where(
+                UploadJob.id == job_id,
+                UploadJob.status == "waiting",
+                UploadJob.filename == filename,
+            )
+            .values(status="summarizing", updated_at=time.time())
+        )
+        db.session.commit()
+        if claimed.rowcount == 1:
+            return db.session.get(UploadJob, job_id)
+
+
+def job_payload(job):
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "status": job.status,
+        "summary": job.summary,
+        "error": job.error,
+        "status_url": url_for("blog.upload_status", job_id=job.id),
+        "trace_url": url_for("blog.upload_trace", job_id=job.id),
+    }
+
+
+@bp.route("/upload", methods=["GET", "POST"])
 def upload_file():
     if not current_user.is_authenticated:  # Check if user is logged in
         flash("You must be logged in to upload files.")
@@ -365,180 +753,38 @@ def upload_file():
             403,
         )  # Forbidden
 
-    global chatgpt_driver, upload_counter, final_summary
-
     # ✅ First, check if Kaggle is just sending output
     if request.method == "POST" and "output" in request.form:
         output = request.form.get("output")
         print("📥 Received output from Kaggle:", output)
-        final_prompt = (f"Here are my snippet summaries: {output} "
-                        f"Please combine these snippets into one cohesive summary.")
-
-        import undetected_chromedriver as uc
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-        import time
-
-        print("Initializing ChatGPT driver and performing login...")
-        chrome_options = uc.ChromeOptions()
-        # chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-background-timer-throttling")
-        chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-        chrome_options.add_argument("--disable-renderer-backgrounding")
-        chatgpt_driver = uc.Chrome(options=chrome_options)
-        chatgpt_driver.get("https://chatgpt.com")
-
-        # time.sleep(random.uniform(2, 4))
-        #
-        # # Perform login steps...
-        # # LOGIN_BTN = (By.CSS_SELECTOR, '[data-testid="login-button"]')
-        # # WebDriverWait(chatgpt_driver, 20).until(EC.element_to_be_clickable(LOGIN_BTN)).click()
-        # login_btn = chatgpt_driver.find_element(By.CSS_SELECTOR, '[data-testid="login-button"]')
-        #
-        # # Create an ActionChains instance
-        # actions = ActionChains(chatgpt_driver)
-        #
-        # # Move to the element, pause, then click it
-        # actions.move_to_element(login_btn).pause(random.uniform(0.5, 1
-        # .5)).click(login_btn).perform()
-        # # EMAIL_INPUT = (By.CSS_SELECTOR, '[id="email-input"]')
-        # # WebDriverWait(chatgpt_driver, 20
-        # ).until(EC.element_to_be_clickable(EMAIL_INPUT)).send_keys(
-        # #     os.getenv("CHATGPT_EMAIL", ""))
-        #
-        # # NEXTBUTTON = (By.CSS_SELECTOR, 'input.continue-btn')
-        # # WebDriverWait(chatgpt_driver, 20).until(EC.element_to_be_clickable(NEXTBUTTON)).click()
-        # time.sleep(random.uniform(2, 4))
-        #
-        # EMAIL_INPUT = (By.CSS_SELECTOR, '[id="email-input"]')
-        # email_input_elem = WebDriverWait(chatgpt_driver, 20
-        # ).until(EC.element_to_be_clickable(EMAIL_INPUT))
-        # actions.move_to_element(email_input_elem).pause(random.uniform(0.5, 1.0)).send_keys(
-        #     os.getenv("CHATGPT_EMAIL", "")).perform()
-        #
-        # # # Wait until at least one Next button is present
-        # # WebDriverWait(chatgpt_driver, 15).until(
-        # #     EC.presence_of_element_located((By.CSS_SELECTOR, '[jsname="V67aGc"]'))
-        # # )
-        # # time.sleep(random.uniform(2, 4))
-        #
-        # buttons = chatgpt_driver.find_elements(By.CSS_SELECTOR, '.continue-btn')
-        # found = False
-        # for btn in buttons:
-        #     btn_value = btn.get_attribute("value")
-        #     print("Found button with value:", btn_value)
-        #     if btn_value and btn_value.strip().lower() == "continue":
-        #         found = True
-        #         print("Button location:", btn.location)
-        #         print("Button size:", btn.size)
-        #         if btn.is_displayed():
-        #             print("Button is displayed.")
-        #         else:
-        #             print("Button is NOT displayed.")
-        #
-        #         try:
-        #             actions = ActionChains(chatgpt_driver)
-        #             actions.move_to_element(btn).pause(ran
-        #             dom.uniform(0.5, 1.5)).click(btn).perform()
-        #             print("Button clicked successfully.")
-        #         except Exception as e:
-        #             print("Failed to click button:", str(e))
-        #         break
-        #
-        # if not found:
-        #     print("No button with value 'Continue' found.")
-        #
-        # captcha_locator = (By.CSS_SELECTOR, '.captcha-overlay')
-        #
-        # try:
-        #     # Wait up to 60 seconds for the captcha overlay to vanish.
-        #     WebDriverWait(chatgpt_driver, 120).until(
-        #         EC.invisibility_of_element_located(captcha_locator)
-        #     )
-        #     print("Captcha has disappeared.")
-        # except TimeoutException:
-        #     print("Captcha did not disappear within 60 seconds. Proceeding anyway.")
-        # try:
-        #     # Wait for the password input field to be visible
-        #     password_input = WebDriverWait(chatgpt_driver, 40).until(
-        #         EC.visibility_of_element_located((By.CSS_SELECTOR, "input#password"))
-        #     )
-        #     password_input.send_keys(os.getenv("CHATGPT_PASSWORD", ""))
-        #     print("Password typed successfully.")
-        # except TimeoutException:
-        #     print("Timeout waiting for password input field to become visible.")
-        #
-        # # # Now wait for the actual password input to become visible.
-        # # # Often it might be an <input> with type="password".
-        # # password_input = WebDriverWait(chatgpt_driver, 20).until(
-        # #     EC.visibility_of_element_located((By.CSS_SELECTOR, "input[type='password']"))
-        # # )
-        # # password_input.send_keys(os.getenv("CHATGPT_PASSWORD", ""))
-        # # print("Password typed successfully.")
-        # # Define the PASSWORD locator
-        # # PASSWORD = (By.CSS_SELECTOR, '[id="password"]')
-        # #
-        # # # Increase wait time if needed (e.g., 40 seconds instead of 20)
-        # # try:
-        # #     print("Waiting for the password field to become clickable...")
-        # #     password_elem = WebDriverWait(chatgpt_driver, 40).until(
-        # #         EC.element_to_be_clickable(PASSWORD)
-        # #     )
-        # #     print("Password field is clickable. Typing password...")
-        # #     password_elem.send_keys(os.getenv("CHATGPT_PASSWORD", ""))
-        # #     print("Password typed successfully.")
-        # # except TimeoutException as e:
-        # #     print("Timeout waiting for password field to be clickable.")
-        # #     # Optionally, try to check if the element exists:
-        # #     elems = chatgpt_driver.find_elements(By.CSS_SELECTOR, '[id="password"]')
-        # #     if elems:
-        # #         print("Found password field elements:", len(elems))
-        # #     else:
-        # #         print("No password field element found.")
-        # #     # As a fallback, you can try clicking via JavaScript if needed:
-        # #     try:
-        # #         if elems:
-        # #             chatgpt_driver.execute_script("arguments[0].click();", elems[0])
-        # #             elems[0].send_keys("")
-        # #             print("Password typed via JavaScript click fallback.")
-        # #     except Exception as js_e:
-        # #         print("Fallback method also failed:", str(js_e))
-        # # PASSWORD = (By.CSS_SELECTOR, '[id="password"]')
-        # # WebDriverWait(chatgpt_driver, 20).until(EC.element_to_be_cli
-        # ckable(PASSWORD)).send_keys("")
-        #
-        # SUBMIT = (By.CSS_SELECTOR, '[name="action"]')
-        # WebDriverWait(chatgpt_driver, 20).until(EC.element_to_be_clickable(SUBMIT)).click()
-        #
-        # REASON = (By.CSS_SELECTOR, '[aria-label="Reason"]')
-        # WebDriverWait(chatgpt_driver, 10).until(EC.element_to_be_clickable(REASON)).click()
-        # print("ChatGPT driver initialized and logged in.")
-
-        # driver = chatgpt_driver
-        # driver.get("https://chatgpt.com/")
-
-        CHAT_BOX = (By.CSS_SELECTOR, '[data-placeholder="Ask anything"]')
-        WebDriverWait(chatgpt_driver, 20).until(
-            EC.element_to_be_clickable(CHAT_BOX)
-        ).send_keys(final_prompt)
-
-        SEND_BTN = (By.CSS_SELECTOR, '[data-testid="send-button"]')
-        WebDriverWait(chatgpt_driver, 20).until(
-            EC.element_to_be_clickable(SEND_BTN)
-        ).click()
-        time.sleep(10)
-        RESPONSE_LOCATOR = (
-            By.CSS_SELECTOR,
-            '[class="markdown prose w-full break-words dark:prose-invert dark"]',
-        )
-        output_element = WebDriverWait(chatgpt_driver, 30).until(
-            EC.presence_of_element_located(RESPONSE_LOCATOR)
-        )
-        final_summary = output_element.text
-        print("Final Combined Summary:", final_summary)
-        chatgpt_driver.quit()
-        return jsonify({"summary": final_summary}), 200
+        # The notebook sends its per-stage timings along with the summaries.
+        try:
+            pipeline_trace = json.loads(request.form.get("trace") or "null")
+        except ValueError:
+            pipeline_trace = None
+        if not isinstance(pipeline_trace, dict):
+            pipeline_trace = None
+        # The notebook picks pending videos by name, not in upload order, so
+        # hand the output to the job for the video it actually summarized.
+        video = request.form.get("video") or (pipeline_trace or {}).get("job")
+        filename = secure_filename(str(video or ""))
+        if not filename:
+            return jsonify({"error": "The output does not name the video it summarizes."}), 400
+        job = claim_waiting_job(filename)
+        if job is None:
+            return jsonify({"error": f"No upload of {filename} is waiting for a summary."}), 404
+        if pipeline_trace is not None:
+            # Metrics are best effort: a malformed trace must not lose the summaries.
+            try:
+                record_pipeline_trace(pipeline_trace)
+            except Exception as e:
+                print("⚠️ Could not record the pipeline trace:", str(e))
+            trace = load_trace(job)
+            trace["pipeline"] = pipeline_trace
+            job.trace = json.dumps(trace)
+        db.session.commit()
+        submit_job(finish_summary, job.id, output)
+        return jsonify(job_payload(job)), 202
 
     # ✅ Then check for a file upload from the user
     if request.method == "POST":
@@ -551,33 +797,43 @@ def upload_file():
             return redirect(request.url)
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+            filepath = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
             file.save(filepath)
             flash(f"File saved at {filepath}")
 
-            # Step 1: Update Kaggle dataset
-            ds_success = update_kaggle_dataset(filepath)
-            if ds_success:
-                flash("Video uploaded & Kaggle dataset updated!")
-                # Step 2: Run or refresh the Kaggle notebook via Selenium
-                kernel_success = run_kaggle_notebook_selenium()
-                if kernel_success:
-                    flash("Kaggle notebook re-run triggered successfully!")
-                else:
-                    flash("Kaggle notebook run failed or did not complete.")
-                upload_counter += 1
-                # Replace with actual summary
-                # Return JSON response with the summary so that the frontend can display it.
-                return jsonify({"summary": final_summary}), 200
-            else:
-                flash("Video uploaded, but dataset update failed.")
-                return jsonify({"error": "Dataset update failed."}), 500
+            job = UploadJob(
+                filename=filename,
+                status="queued",
+                date=date.today().strftime("%B %d, %Y"),
+                updated_at=time.time(),
+            )
+            db.session.add(job)
+            db.session.commit()
+            submit_job(process_upload, job.id, filepath, time.time(), pool="kaggle")
+            # The frontend polls status_url until the summary is ready.
+            return jsonify(job_payload(job)), 202
 
     # Render upload form for GET requests
     return render_template("upload.html")
 
 
-@app.route("/login", methods=["GET", "POST"])
+@bp.route("/upload/status/<int:job_id>")
+def upload_status(job_id):
+    if not current_user.is_authenticated:
+        return jsonify({"error": "Unauthorized access. Please log in."}), 403
+    expire_waiting_jobs()
+    return jsonify(job_payload(db.get_or_404(UploadJob, job_id)))
+
+
+@bp.route("/upload/trace/<int:job_id>")
+def upload_trace(job_id):
+    if not current_user.is_authenticated:
+        return jsonify({"error": "Unauthorized access. Please log in."}), 403
+    job = db.get_or_404(UploadJob, job_id)
+    return jsonify({"job_id": job.id, "status": job.status, **load_trace(job)})
+
+
+@bp.route("/login", methods=["GET", "POST"])
 def login():
     form = LoginForm()
     if form.validate_on_submit():
@@ -589,38 +845,54 @@ def login():
 
         if not user:
             flash("That email does not exist, please try again.")
-            return redirect(url_for("login"))
+            return redirect(url_for("blog.login"))
         elif not check_password_hash(user.password, password):
             flash("Password incorrect, please try again.")
-            return redirect(url_for("login"))
+            return redirect(url_for("blog.login"))
         else:
             login_user(user)
-            return redirect(url_for("get_all_posts"))
+            return redirect(url_for("blog.get_all_posts"))
 
     return render_template("login.html", form=form, current_user=current_user)
 
 
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     logout_user()
-    return redirect(url_for("get_all_posts"))
+    return redirect(url_for("blog.get_all_posts"))
 
 
-@app.route("/")
+@bp.route("/")
 def get_all_posts():
     result = db.session.execute(db.select(BlogPost))
     posts = result.scalars().all()
     return render_template("index.html", all_posts=posts, current_user=current_user)
 
 
-@app.route("/post/<int:post_id>", methods=["GET", "POST"])
+@bp.route("/search")
+def search():
+    query = request.args.get("q", "").strip()
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+    results = search_index.search(query, limit=limit) if query else []
+    for result in results:
+        if result["kind"] == "post":
+            result["url"] = url_for("blog.show_post", post_id=result["id"])
+    return jsonify({"query": query, "results": results})
+
+
+@bp.route("/post/<int:post_id>", methods=["GET", "POST"])
 def show_post(post_id):
-    requested_post = db.get_or_404(BlogPost, post_id)
+    # Load comments and their authors up front instead of one query per comment
+    requested_post = db.get_or_404(
+        BlogPost,
+        post_id,
+        options=[selectinload(BlogPost.comments).joinedload(Comment.comment_author)],
+    )
     comment_form = CommentForm()
     if comment_form.validate_on_submit():
         if not current_user.is_authenticated:
             flash("You need to login or register to comment.")
-            return redirect(url_for("login"))
+            return redirect(url_for("blog.login"))
 
         new_comment = Comment(
             text=comment_form.comment_text.data,
@@ -634,7 +906,7 @@ def show_post(post_id):
     )
 
 
-@app.route("/new-post", methods=["GET", "POST"])
+@bp.route("/new-post", methods=["GET", "POST"])
 @admin_only
 def add_new_post():
     form = CreatePostForm()
@@ -649,11 +921,11 @@ def add_new_post():
         )
         db.session.add(new_post)
         db.session.commit()
-        return redirect(url_for("get_all_posts"))
+        return redirect(url_for("blog.get_all_posts"))
     return render_template("make-post.html", form=form, current_user=current_user)
 
 
-@app.route("/edit-post/<int:post_id>", methods=["GET", "POST"])
+@bp.route("/edit-post/<int:post_id>", methods=["GET", "POST"])
 def edit_post(post_id):
     post = db.get_or_404(BlogPost, post_id)
     edit_form = CreatePostForm(
@@ -670,30 +942,76 @@ def edit_post(post_id):
         post.author = current_user
         post.body = edit_form.body.data
         db.session.commit()
-        return redirect(url_for("show_post", post_id=post.id))
+        return redirect(url_for("blog.show_post", post_id=post.id))
     return render_template(
         "make-post.html", form=edit_form, is_edit=True, current_user=current_user
     )
 
 
-@app.route("/delete/<int:post_id>")
+@bp.route("/delete/<int:post_id>")
 @admin_only
 def delete_post(post_id):
     post_to_delete = db.get_or_404(BlogPost, post_id)
     db.session.delete(post_to_delete)
     db.session.commit()
-    return redirect(url_for("get_all_posts"))
+    return redirect(url_for("blog.get_all_posts"))
 
 
-@app.route("/about")
+@bp.route("/about")
 def about():
     return render_template("about.html", current_user=current_user)
 
 
-@app.route("/contact")
+@bp.route("/contact")
 def contact():
     return render_template("contact.html", current_user=current_user)
 
 
+# -----------------------
+# APPLICATION FACTORY
+# -----------------------
+def create_app(config=None):
+    """
+    Builds a configured app. Safe to call once in the gunicorn master with
+    --preload: no pooled database connections survive into forked workers.
+    """
+    load_dotenv()  # Load environment variables from .env file
+
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = os.getenv("FLASK_KEY")
+    app.secret_key = os.getenv("FLASK_SECRET_KEY", "your_secret_key_here")  # Keep this secret
+    app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DB_URI", "sqlite:///posts.db")
+    if config:
+        app.config.update(config)
+
+    ckeditor.init_app(app)
+    bootstrap.init_app(app)
+    init_assets(app)
+    init_metrics(app)
+    login_manager.init_app(app)
+    db.init_app(app)
+
+    # For adding profile images to the comment section
+    app.extensions["avatars"] = Avatars(
+        app,
+        size=100,
+        rating="g",
+        default="retro",
+        mode=os.getenv("AVATAR_MODE", "local"),
+    )
+
+    app.register_blueprint(bp)
+
+    with app.app_context():
+        db.create_all()
+        search_index.create_all()
+        # An in-memory SQLite database lives in its single StaticPool connection.
+        if not isinstance(db.engine.pool, StaticPool):
+            db.engine.dispose()
+
+    return app
+
+
 if __name__ == "__main__":
-    app.run(debug=True, use_reloader=False)
+    create_app().run(debug=True, use_reloader=False)
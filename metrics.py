@@ -0,0 +1,234 @@
+"""
+In-process metrics exposed in the Prometheus text format at /metrics.
+
+Counters and histograms are plain dicts guarded by one lock, so recording a
+sample is a dict lookup and an add. Each gunicorn worker keeps its own
+registry; scrape every worker (or run a single worker with threads) to see
+the whole picture.
+
+Besides HTTP request timing, the app records its own upload steps
+(Kaggle dataset update, notebook trigger, ChatGPT combine) and ingests the
+per-stage trace the Kaggle notebook posts back with its output.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+
+def _format_labels(names, values, extra=""):
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=HTTP_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, state):
+                    le = _format_labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                inf = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {state[-1]}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {state[-2]}")
+                lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# -----------------------
+# METRICS
+# -----------------------
+REGISTRY = Registry()
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests handled.", ("method", "endpoint", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests.",
+    ("method", "endpoint"),
+)
+UPLOAD_STEP_LATENCY = REGISTRY.histogram(
+    "upload_step_duration_seconds",
+    "Time spent in the app's own upload steps.",
+    ("step",),
+    buckets=STAGE_BUCKETS,
+)
+PIPELINE_STAGE_LATENCY = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds",
+    "Summarization pipeline stage durations reported by the Kaggle notebook.",
+    ("stage",),
+    buckets=STAGE_BUCKETS,
+)
+PIPELINE_STAGE_PEAK_RSS = REGISTRY.histogram(
+    "pipeline_stage_peak_rss_megabytes",
+    "Peak resident memory of the pipeline process at the end of each stage.",
+    ("stage",),
+    buckets=(256, 512, 1024, 2048, 4096, 8192, 16384, 32768),
+)
+
+
+# -----------------------
+# JOB TRACES
+# -----------------------
+class StepTrace:
+    """Records the app-side spans of one upload job, mirroring PipelineTrace."""
+
+    def __init__(self, spans=None):
+        self.spans = list(spans or [])
+
+    @contextmanager
+    def span(self, name, **attrs):
+        start = time.perf_counter()
+        started_at = time.time()
+        try:
+            yield attrs
+        finally:
+            self.record(name, started_at, time.perf_counter() - start, **attrs)
+
+    def record(self, name, started_at, duration, **attrs):
+        """Adds a span measured elsewhere, such as time spent queued."""
+        UPLOAD_STEP_LATENCY.observe(duration, step=name)
+        self.spans.append(
+            {"name": name, "started_at": started_at, "duration_s": round(duration, 6), **attrs}
+        )
+
+
+def _number(value):
+    """Returns value as a float if it is a finite number, otherwise None."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value) if math.isfinite(value) else None
+
+
+def record_pipeline_trace(trace):
+    """
+    Feeds the spans of a trace posted by the notebook into the histograms.
+    Spans that are not dicts, lack a name or carry non-numeric values are skipped.
+    """
+    spans = trace.get("spans") if isinstance(trace, dict) else None
+    if not isinstance(spans, list):
+        return
+    for span in spans:
+        if not isinstance(span, dict):
+            continue
+        name = span.get("name")
+        duration = _number(span.get("duration_s"))
+        if not name or not isinstance(name, str) or duration is None:
+            continue
+        PIPELINE_STAGE_LATENCY.observe(duration, stage=name)
+        peak_rss = _number(span.get("peak_rss_mb"))
+        if peak_rss is not None:
+            PIPELINE_STAGE_PEAK_RSS.observe(peak_rss, stage=name)
+
+
+# -----------------------
+# FLASK INTEGRATION
+# -----------------------
+def init_metrics(app):
+    """Times every request and serves the registry at /metrics."""
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            endpoint = request.endpoint or "unmatched"
+            HTTP_LATENCY.observe(
+                time.perf_counter() - started, method=request.method, endpoint=endpoint
+            )
+            HTTP_REQUESTS.inc(
+                method=request.method, endpoint=endpoint, status=response.status_code
+            )
+        return response
+
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule("/metrics", "metrics", metrics)
@@ -0,0 +1,232 @@
+"""
+Full-text search over blog posts and stored video summaries.
+
+On SQLite the index is an FTS5 virtual table ranked with bm25(); when DB_URI
+points at Postgres it is a regular table with a weighted, generated tsvector
+column behind a GIN index. Both backends are kept up to date from SQLAlchemy
+mapper events, so every create/edit/delete that goes through the ORM updates
+the index inside the same transaction.
+"""
+
+import html
+import re
+
+from sqlalchemy import event, inspect, text
+
+INDEX_TABLE = "search_index"
+
+# Each indexed row is stored under a single integer id: the model's primary key
+# shifted left, with the low bits identifying which kind of document it is.
+KIND_BITS = 4
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} "
+    "USING fts5(title, subtitle, body, tokenize='porter unicode61')",
+]
+
+_POSTGRES_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {INDEX_TABLE} (
+        doc_id BIGINT PRIMARY KEY,
+        title TEXT NOT NULL DEFAULT '',
+        subtitle TEXT NOT NULL DEFAULT '',
+        body TEXT NOT NULL DEFAULT '',
+        document tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', title), 'A') ||
+            setweight(to_tsvector('english', subtitle), 'B') ||
+            setweight(to_tsvector('english', body), 'C')
+        ) STORED
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_{INDEX_TABLE}_document "
+    f"ON {INDEX_TABLE} USING GIN (document)",
+]
+
+# bm25() weights are per column (title, subtitle, body); lower scores rank higher.
+_SQLITE_QUERY = f"""
+    SELECT rowid AS doc_id,
+           title,
+           snippet({INDEX_TABLE}, 2, '<mark>', '</mark>', '…', 16) AS snippet,
+           bm25({INDEX_TABLE}, 10.0, 4.0, 1.0) AS score
+    FROM {INDEX_TABLE}
+    WHERE {INDEX_TABLE} MATCH :match
+    ORDER BY score
+    LIMIT :limit
+"""
+
+# Headlines are only built for the rows that survive the LIMIT.
+_POSTGRES_QUERY = f"""
+    SELECT hits.doc_id,
+           hits.title,
+           ts_headline('english', hits.body, hits.q,
+                       'StartSel=<mark>, StopSel=</mark>, MaxWords=24, MinWords=8')
+               AS snippet,
+           hits.score
+    FROM (
+        SELECT doc_id, title, body, q, ts_rank_cd(document, q) AS score
+        FROM {INDEX_TABLE}, websearch_to_tsquery('english', :match) AS q
+        WHERE document @@ q
+        ORDER BY score DESC
+        LIMIT :limit
+    ) AS hits
+    ORDER BY hits.score DESC
+"""
+
+
+def strip_html(value):
+    """Reduces CKEditor HTML to the plain text worth indexing."""
+    if not value:
+        return ""
+    return " ".join(html.unescape(_TAG_RE.sub(" ", value)).split())
+
+
+def build_fts5_query(query):
+    """
+    Turns free text into a safe FTS5 MATCH expression: every word must
+    appear, and the last word is treated as a prefix so results show up
+    while the user is still typing.
+    """
+    tokens = _TOKEN_RE.findall(query or "")
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    Keeps a full-text index in sync with the models registered via watch().
+
+    Usage:
+        search_index = SearchIndex(db)
+        search_index.watch(BlogPost, "post", lambda p: (p.title, p.subtitle, p.body))
+        with app.app_context():
+            db.create_all()
+            search_index.create_all()
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.kinds = {}  # kind name -> (code, model, fields)
+
+    # -----------------------
+    # REGISTRATION
+    # -----------------------
+    def watch(self, model, kind, fields):
+        """
+        Indexes `model` under `kind`. `fields(obj)` returns the
+        (title, subtitle, body) strings to index for one row.
+        """
+        code = len(self.kinds) + 1
+        if code >= 1 << KIND_BITS:
+            raise ValueError("Too many searchable models registered.")
+        self.kinds[kind] = (code, model, fields)
+
+        def on_save(mapper, connection, target):
+            self._upsert(connection, code, target.id, fields(target))
+
+        def on_delete(mapper, connection, target):
+            self._delete(connection, code, target.id)
+
+        event.listen(model, "after_insert", on_save)
+        event.listen(model, "after_update", on_save)
+        event.listen(model, "after_delete", on_delete)
+
+    def create_all(self):
+        """
+        Creates the index if it does not exist yet and backfills it from the
+        watched tables. Must be called inside an application context.
+        """
+        session = self.db.session
+        connection = session.connection()
+        already_built = inspect(connection).has_table(INDEX_TABLE)
+        is_postgres = connection.dialect.name == "postgresql"
+        for statement in _POSTGRES_DDL if is_postgres else _SQLITE_DDL:
+            connection.execute(text(statement))
+        if not already_built:
+            for code, model, fields in self.kinds.values():
+                for obj in session.execute(self.db.select(model)).scalars():
+                    self._upsert(connection, code, obj.id, fields(obj))
+        session.commit()
+
+    # -----------------------
+    # QUERYING
+    # -----------------------
+    def search(self, query, limit=20):
+        """
+        Returns up to `limit` ranked hits for `query` as dicts with
+        `kind`, `id`, `title`, `snippet` and `score` keys.
+        """
+        connection = self.db.session.connection()
+        if connection.dialect.name == "postgresql":
+            match = " ".join(_TOKEN_RE.findall(query or ""))
+            sql = _POSTGRES_QUERY
+        else:
+            match = build_fts5_query(query)
+            sql = _SQLITE_QUERY
+        if not match:
+            return []
+
+        codes = {code: kind for kind, (code, _, _) in self.kinds.items()}
+        rows = connection.execute(text(sql), {"match": match, "limit": limit})
+        results = []
+        for row in rows:
+            kind = codes.get(row.doc_id & ((1 << KIND_BITS) - 1))
+            if kind is None:
+                continue
+            results.append(
+                {
+                    "kind": kind,
+                    "id": row.doc_id >> KIND_BITS,
+                    "title": row.title,
+                    "snippet": row.snippet,
+                    "score": abs(float(row.score)),
+                }
+            )
+        return results
+
+    # -----------------------
+    # INDEX MAINTENANCE
+    # -----------------------
+    @staticmethod
+    def _doc_id(code, ref_id):
+        return (ref_id << KIND_BITS) | code
+
+    def _upsert(self, connection, code, ref_id, values):
+        title, subtitle, body = (strip_html(value) for value in values)
+        params = {
+            "doc_id": self._doc_id(code, ref_id),
+            "title": title,
+            "subtitle": subtitle,
+            "body": body,
+        }
+        if connection.dialect.name == "postgresql":
+            connection.execute(
+                text(
+                    f"INSERT INTO {INDEX_TABLE} (doc_id, title, subtitle, body) "
+                    "VALUES (:doc_id, :title, :subtitle, :body) "
+                    "ON CONFLICT (doc_id) DO UPDATE SET title = EXCLUDED.title, "
+                    "subtitle = EXCLUDED.subtitle, body = EXCLUDED.body"
+                ),
+                params,
+            )
+        else:
+            self._delete(connection, code, ref_id)
+            connection.execute(
+                text(
+                    f"INSERT INTO {INDEX_TABLE} (rowid, title, subtitle, body) "
+                    "VALUES (:doc_id, :title, :subtitle, :body)"
+                ),
+                params,
+            )
+
+    def _delete(self, connection, code, ref_id):
+        key = "doc_id" if connection.dialect.name == "postgresql" else "rowid"
+        connection.execute(
+            text(f"DELETE FROM {INDEX_TABLE} WHERE {key} = :doc_id"),
+            {"doc_id": self._doc_id(code, ref_id)},
+        )
@@ -1,11 +1,18 @@
+import io
+import json
+import time
+
 import pytest
-from main import app
+from main import create_app, db, BlogPost, User
+
+
+@pytest.fixture
+def app():
+    return create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
 
 
 @pytest.fixture
-def client():
-    app.config["TESTING"] = True
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+def client(app):
     with app.test_client() as client:
         yield client
 
@@ -147,3 +154,161 @@ def test_404_page(client):
     """Ensure that a random non-existent route returns 404."""
     response = client.get("/thispagedoesnotexist")
     assert response.status_code == 404
+
+
+def test_search_empty_query(client):
+    """An empty search returns no results instead of an error."""
+    response = client.get("/search?q=")
+    assert response.status_code == 200
+    assert response.get_json()["results"] == []
+
+
+def test_search_clamps_limit(client):
+    """Zero or negative limits are clamped instead of reaching the database."""
+    for limit in (-1, 0):
+        response = client.get(f"/search?q=quokka&limit={limit}")
+        assert response.status_code == 200
+        assert response.get_json()["results"] == []
+
+
+def test_search_tracks_post_changes(app, client):
+    """Posts are searchable after create, re-indexed on edit and dropped on delete."""
+    with app.app_context():
+        author = User(email="searcher@example.com", password="x", name="Searcher")
+        post = BlogPost(
+            title="Quokka migration patterns",
+            subtitle="Field notes",
+            body="<p>Nocturnal <b>marsupials</b> on Rottnest</p>",
+            img_url="https://example.com/quokka.jpg",
+            date="January 01, 2025",
+            author=author,
+        )
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+    try:
+        results = client.get("/search?q=marsupial").get_json()["results"]
+        assert [r["id"] for r in results if r["kind"] == "post"] == [post_id]
+        assert results[0]["url"] == f"/post/{post_id}"
+
+        with app.app_context():
+            db.session.get(BlogPost, post_id).body = "<p>Wombat burrows</p>"
+            db.session.commit()
+        assert client.get("/search?q=marsupial").get_json()["results"] == []
+        assert client.get("/search?q=wombat").get_json()["results"][0]["id"] == post_id
+    finally:
+        with app.app_context():
+            db.session.delete(db.session.get(BlogPost, post_id))
+            db.session.delete(db.session.execute(
+                db.select(User).where(User.email == "searcher@example.com")
+            ).scalar())
+            db.session.commit()
+
+    assert client.get("/search?q=wombat").get_json()["results"] == []
+
+
+def wait_for_status(client, url, statuses, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        data = client.get(url).get_json()
+        if data["status"] in statuses:
+            return data
+        time.sleep(0.05)
+    raise AssertionError(f"job never reached {statuses}: {data}")
+
+
+def make_upload_app(tmp_path, **config):
+    app = create_app(
+        {
+            "TESTING": True,
+            # The job runs on another thread; an in-memory database would share
+            # one connection (and transaction) between it and the test client.
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'blog.db'}",
+            "UPLOAD_FOLDER": str(tmp_path),
+            "PIPELINE_RUNNER": lambda filepath: None,
+            "SUMMARY_COMBINER": lambda output: f"Combined: {output}",
+            **config,
+        }
+    )
+    with app.app_context():
+        db.session.add(User(email="uploader@example.com", password="x", name="Uploader"))
+        db.session.commit()
+    return app
+
+
+def log_in(client):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = "1"
+        sess["_fresh"] = True
+
+
+def test_upload_runs_in_background(tmp_path):
+    """Uploads return a job immediately; the Kaggle callback completes it."""
+    app = make_upload_app(tmp_path)
+    with app.test_client() as client:
+        log_in(client)
+
+        response = client.post(
+            "/upload", data={"file": (io.BytesIO(b"video"), "clip.mp4")}
+        )
+        assert response.status_code == 202
+        job = response.get_json()
+        assert job["filename"] == "clip.mp4"
+        wait_for_status(client, job["status_url"], {"waiting"})
+
+        response = client.post(
+            "/upload", data={"output": "Snippet 001: a cat.", "video": "clip.mp4"}
+        )
+        assert response.status_code == 202
+        assert response.get_json()["job_id"] == job["job_id"]
+        done = wait_for_status(client, job["status_url"], {"done", "failed"})
+        assert done["summary"] == "Combined: Snippet 001: a cat."
+
+        results = client.get("/search?q=cat").get_json()["results"]
+        assert [r["kind"] for r in results] == ["summary"]
+
+
+def test_callback_goes_to_the_job_for_its_video(tmp_path):
+    """The notebook's output lands on the job for the video it summarized."""
+    app = make_upload_app(tmp_path)
+    with app.test_client() as client:
+        log_in(client)
+        jobs = {}
+        for name in ("b.mp4", "a.mp4"):
+            response = client.post("/upload", data={"file": (io.BytesIO(b"video"), name)})
+            jobs[name] = response.get_json()
+            wait_for_status(client, jobs[name]["status_url"], {"waiting"})
+
+        # The notebook works through the dataset by filename, so a.mp4 comes first.
+        trace = json.dumps({"job": "a.mp4", "spans": []})
+        response = client.post("/upload", data={"output": "Snippet 001: an owl.", "trace": trace})
+        assert response.get_json()["job_id"] == jobs["a.mp4"]["job_id"]
+        done = wait_for_status(client, jobs["a.mp4"]["status_url"], {"done", "failed"})
+        assert done["summary"] == "Combined: Snippet 001: an owl."
+        assert client.get(jobs["b.mp4"]["status_url"]).get_json()["status"] == "waiting"
+
+        # A repeated callback for a.mp4 cannot claim a job a second time, and
+        # output that names no video is rejected rather than given a new job.
+        response = client.post("/upload", data={"output": "again", "video": "a.mp4"})
+        assert response.status_code == 404
+        response = client.post("/upload", data={"output": "who am I?"})
+        assert response.status_code == 400
+        assert client.get(jobs["b.mp4"]["status_url"]).get_json()["status"] == "waiting"
+
+
+def test_stale_waiting_jobs_expire(tmp_path):
+    """A job the notebook never calls back for fails, so the page stops polling."""
+    app = make_upload_app(tmp_path, KAGGLE_WAIT_TIMEOUT=0.2)
+    with app.test_client() as client:
+        log_in(client)
+        response = client.post("/upload", data={"file": (io.BytesIO(b"video"), "lost.mp4")})
+        job = wait_for_status(client, response.get_json()["status_url"], {"waiting", "failed"})
+        failed = wait_for_status(client, job["status_url"], {"failed"})
+        assert "never sent its output back" in failed["error"]
+        response = client.post("/upload", data={"output": "late", "video": "lost.mp4"})
+        assert response.status_code == 404
+
+
+def test_upload_status_requires_login(client):
+    assert client.get("/upload/status/1").status_code == 403
@@ -0,0 +1,56 @@
+import gzip
+
+from flask import Flask, render_template_string
+
+from assets import build_assets, init_assets
+
+
+def make_app(tmp_path):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "css" / "styles.css").write_text("body { color: red; }\n" * 50)
+    (static / "assets").mkdir()
+    (static / "assets" / "photo.jpg").write_bytes(b"\xff\xd8not really a jpeg")
+    manifest = build_assets(str(static))
+    app = Flask(__name__, static_folder=str(static))
+    init_assets(app)
+    return app, manifest
+
+
+def test_build_fingerprints_and_compresses(tmp_path):
+    app, manifest = make_app(tmp_path)
+    hashed = manifest["css/styles.css"]
+    assert hashed.startswith("css/styles.") and hashed.endswith(".css")
+    dist = tmp_path / "static" / "dist"
+    assert (dist / (hashed + ".gz")).exists()
+    # Images are copied but not recompressed.
+    assert not (dist / (manifest["assets/photo.jpg"] + ".gz")).exists()
+
+
+def test_asset_url_points_at_hashed_copy(tmp_path):
+    app, manifest = make_app(tmp_path)
+    with app.test_request_context():
+        assert render_template_string("{{ asset_url('css/styles.css') }}") == (
+            "/dist/" + manifest["css/styles.css"]
+        )
+        # Files outside the manifest fall back to the plain static route.
+        assert render_template_string("{{ asset_url('missing.css') }}") == "/static/missing.css"
+
+
+def test_serves_precompressed_variant(tmp_path):
+    app, manifest = make_app(tmp_path)
+    url = "/dist/" + manifest["css/styles.css"]
+    client = app.test_client()
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.mimetype == "text/css"
+    assert gzip.decompress(response.data).startswith(b"body")
+    response.close()
+
+    response = client.get(url)
+    assert "Content-Encoding" not in response.headers
+    assert response.data.startswith(b"body")
+    response.close()
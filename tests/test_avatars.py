@@ -0,0 +1,56 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, render_template_string
+
+from avatars import URL_CACHE_SIZE, Avatars, email_hash
+
+
+def make_app(tmp_path, mode="local"):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    avatars = Avatars(app, size=60, mode=mode)
+    return app, avatars
+
+
+def test_local_avatar_is_generated_once_and_cached(tmp_path):
+    app, avatars = make_app(tmp_path)
+    digest = email_hash(" Someone@Example.com ")
+    with app.test_request_context():
+        url = render_template_string("{{ 'someone@example.com' | avatar }}")
+    assert url == f"/avatars/{digest}.png"
+
+    client = app.test_client()
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.data.startswith(b"\x89PNG")
+    assert "immutable" in response.headers["Cache-Control"]
+    response.close()
+    assert (tmp_path / "avatars" / f"{digest}.png").exists()
+
+    assert client.get("/avatars/not-a-hash.png").status_code == 404
+
+
+def test_avatar_urls_are_memoized(tmp_path):
+    app, avatars = make_app(tmp_path, mode="gravatar")
+    with app.test_request_context():
+        first = avatars.url("someone@example.com")
+        assert avatars.url("someone@example.com") is first
+    assert first.startswith("https://www.gravatar.com/avatar/")
+    assert "d=retro" in first
+
+
+def test_avatar_url_cache_is_bounded(tmp_path):
+    app, avatars = make_app(tmp_path, mode="gravatar")
+    for i in range(URL_CACHE_SIZE + 100):
+        avatars.url(f"user{i}@example.com")
+    assert avatars.url.cache_info().currsize == URL_CACHE_SIZE
+
+
+def test_concurrent_first_requests_share_one_avatar(tmp_path):
+    app, avatars = make_app(tmp_path)
+    digest = email_hash("someone@example.com")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        names = list(pool.map(avatars.path_for, [digest] * 32))
+    assert names == [f"{digest}.png"] * 32
+    assert sorted(os.listdir(tmp_path / "avatars")) == [f"{digest}.png"]
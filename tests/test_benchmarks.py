@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from benchmarks.pipeline_bench import compare, run_case
+from benchmarks.synthetic import make_video
+
+
+def test_run_case_times_every_stage(tmp_path):
+    video = make_video(str(tmp_path / "tiny.mp4"), seconds=1, size=(320, 180), fps=12)
+    timings = run_case(video, str(tmp_path))
+    for stage in (
+        "load_entire_video",
+        "dynamic_extraction",
+        "diversity_skip",
+        "motion_measurement",
+        "snippet_writing",
+    ):
+        assert timings[stage] >= 0
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"case": {"fast": 0.001, "slow": 1.0, "steady": 1.0}}
+    results = {"case": {"fast": 0.004, "slow": 2.0, "steady": 1.1, "new": 5.0}}
+    regressions = compare(results, baseline, tolerance=0.5)
+    assert len(regressions) == 1 and regressions[0].startswith("case/slow")
+
+
+def test_clip_backends_compare_against_fp32(tmp_path):
+    pytest.importorskip("torch")
+    from benchmarks.clip_backends import ranking_agreement, run
+    from video_summarization import load_entire_video
+
+    video = make_video(str(tmp_path / "tiny.mp4"), seconds=1, size=(160, 90), fps=12)
+    frames, _ = load_entire_video(video, resize_dim=(80, 45))
+    rows = run("tiny", ["torch", "int8"], [1], frames, ["a", "b"], k=3)
+
+    reference, quantized = rows
+    assert (reference["cosine"], reference["topk_overlap"]) == (pytest.approx(1.0), 1.0)
+    assert quantized["backend"] == "int8" and quantized["frames_per_s"] > 0
+    assert quantized["cosine"] > 0.99
+
+    scores = np.array([[3.0, 0.0], [2.0, 1.0], [1.0, 2.0], [0.0, 3.0]])
+    assert ranking_agreement(scores, scores, k=2) == (1.0, pytest.approx(1.0))
+    assert ranking_agreement(scores, -scores, k=2) == (0.0, pytest.approx(-1.0))
+
+
+def test_onnx_backend_matches_torch(tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnxscript")
+    import torch
+
+    from benchmarks.standins import TinyClipModel, TinyClipProcessor
+    from video_summarization import clip_embed_keyframes, convert_clip, load_entire_video
+
+    reference = TinyClipModel()
+    model = convert_clip("onnx", clip_model=TinyClipModel(), model_name="tiny", cache_dir=tmp_path)
+    video = make_video(str(tmp_path / "tiny.mp4"), seconds=1, size=(160, 90), fps=12)
+    frames, _ = load_entire_video(video, resize_dim=(80, 45))
+    keyframes = [{"frame": frame} for frame, _ in frames]
+
+    proc = TinyClipProcessor()
+    expected = clip_embed_keyframes(keyframes, reference, proc, "cpu")
+    embeddings = clip_embed_keyframes(keyframes, model, proc, "cpu")
+    assert np.mean(np.sum(embeddings * expected, axis=1)) > 0.9999
+
+    input_ids = torch.tensor([[5, 17, 42, 0]])
+    attention_mask = torch.tensor([[1, 1, 1, 0]])
+    with torch.no_grad():
+        text_expected = reference.get_text_features(input_ids, attention_mask).numpy()
+    text = model.get_text_features(input_ids, attention_mask).numpy()
+    np.testing.assert_allclose(text, text_expected, rtol=1e-4, atol=1e-5)
+
+    # The export is cached: a second conversion loads it without the fp32 model.
+    assert type(convert_clip("onnx", model_name="tiny", cache_dir=tmp_path)) is type(model)
+
+
+def test_unknown_clip_backend_is_rejected():
+    from video_summarization import convert_clip
+
+    with pytest.raises(ValueError, match="Unknown CLIP backend"):
+        convert_clip("tensorrt")
+
+
+def test_decode_bench_checks_frame_order(tmp_path):
+    from benchmarks.decode_bench import run
+
+    video = make_video(str(tmp_path / "tiny.mp4"), seconds=1, size=(160, 90), fps=12)
+    rows = run(video, [1, 2], repeat=1)
+    assert [row["workers"] for row in rows] == [1, 2]
+    assert all(row["identical"] for row in rows) and rows[0]["speedup"] == 1.0
+
+
+def test_shot_bench_reports_fewer_scored_frames(tmp_path):
+    pytest.importorskip("torch")
+    from benchmarks.shot_bench import run
+
+    video = make_video(str(tmp_path / "long.mp4"), seconds=8, size=(160, 90), fps=12, shots=2)
+    results = run(video, str(tmp_path), repeat=1)
+    assert results["dynamic"]["frames"] == results["shots"]["frames"] == 96
+    assert results["shots"]["keyframes"] < results["dynamic"]["keyframes"]
@@ -0,0 +1,133 @@
+import json
+import time
+
+import pytest
+
+from main import create_app, db, UploadJob, User
+from metrics import Registry
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(
+        {
+            "TESTING": True,
+            # Callbacks finish on a job thread; an in-memory database would share
+            # one connection between it and the test client.
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'metrics.db'}",
+            "UPLOAD_FOLDER": str(tmp_path),
+            "SUMMARY_COMBINER": lambda output: output,
+        }
+    )
+    with app.app_context():
+        db.session.add(User(email="metrics@example.com", password="x", name="Metrics"))
+        db.session.commit()
+    return app
+
+
+def add_waiting_job(app, filename="clip.mp4"):
+    with app.app_context():
+        db.session.add(
+            UploadJob(
+                filename=filename, status="waiting", date="January 01, 2025", updated_at=time.time()
+            )
+        )
+        db.session.commit()
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ("path",))
+    latency = registry.histogram("latency_seconds", "Latency.", ("path",), buckets=(0.1, 1.0))
+    requests.inc(path="/a")
+    requests.inc(2, path="/a")
+    latency.observe(0.5, path="/a")
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{path="/a"} 3' in text
+    assert 'latency_seconds_bucket{path="/a",le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{path="/a",le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{path="/a",le="+Inf"} 1' in text
+    assert 'latency_seconds_count{path="/a"} 1' in text
+
+
+def test_metrics_endpoint_counts_requests(app):
+    client = app.test_client()
+    client.get("/about")
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'http_requests_total{method="GET",endpoint="blog.about",status="200"}' in text
+    assert "http_request_duration_seconds_bucket" in text
+
+
+def test_callback_trace_is_recorded(app):
+    add_waiting_job(app)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = "1"
+        sess["_fresh"] = True
+
+    trace = {
+        "job": "clip.mp4",
+        "spans": [
+            {"name": "clip_scoring", "duration_s": 4.2, "peak_rss_mb": 900.0},
+            {"name": "mplug_caption", "duration_s": 12.0},
+        ],
+    }
+    response = client.post(
+        "/upload", data={"output": "Snippet 001: a dog.", "trace": json.dumps(trace)}
+    )
+    job = response.get_json()
+
+    stored = client.get(job["trace_url"]).get_json()
+    assert stored["pipeline"]["spans"][0]["name"] == "clip_scoring"
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'pipeline_stage_duration_seconds_count{stage="clip_scoring"}' in text
+    assert 'pipeline_stage_peak_rss_megabytes_count{stage="clip_scoring"}' in text
+
+
+@pytest.mark.parametrize(
+    "trace",
+    [
+        {"spans": [{"name": "x", "duration_s": "fast"}]},
+        {"spans": "abc"},
+        {"spans": [None]},
+        {"spans": [{"name": "x", "duration_s": 1.0, "peak_rss_mb": [1]}]},
+    ],
+)
+def test_malformed_trace_does_not_fail_the_callback(app, trace):
+    add_waiting_job(app)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = "1"
+        sess["_fresh"] = True
+
+    response = client.post(
+        "/upload",
+        data={"output": "Snippet 001: a fox.", "video": "clip.mp4", "trace": json.dumps(trace)},
+    )
+    assert response.status_code == 202
+    status_url = response.get_json()["status_url"]
+    deadline = time.time() + 5
+    while client.get(status_url).get_json()["status"] != "done":
+        assert time.time() < deadline, "the summary was never stored"
+        time.sleep(0.05)
+
+
+def test_record_pipeline_trace_skips_bad_spans():
+    from metrics import PIPELINE_STAGE_LATENCY, record_pipeline_trace
+
+    record_pipeline_trace(
+        {
+            "spans": [
+                None,
+                {"name": "bad_stage", "duration_s": "fast"},
+                {"name": "bad_stage", "duration_s": True},
+                {"name": "good_stage", "duration_s": 2},
+            ]
+        }
+    )
+    text = "\n".join(PIPELINE_STAGE_LATENCY.render())
+    assert 'stage="bad_stage"' not in text
+    assert 'pipeline_stage_duration_seconds_count{stage="good_stage"} 1' in text
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported by the code paths that need them.
+HEAVY_MODULES = ("selenium", "undetected_chromedriver", "cv2", "torch", "transformers")
+
+# Generous default so slow CI machines don't flake; tighten locally via env.
+IMPORT_BUDGET_MS = float(os.getenv("MAIN_IMPORT_BUDGET_MS", "3000"))
+
+
+def import_times(statement):
+    """
+    Runs `statement` under `python -X importtime` and returns
+    {module: cumulative_microseconds} for every module it imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        times[name] = int(cumulative)
+    return times
+
+
+@pytest.fixture(scope="module")
+def main_import_times():
+    return import_times("import main")
+
+
+def test_import_skips_heavy_modules(main_import_times):
+    loaded = {name.split(".")[0] for name in main_import_times}
+    assert not loaded & set(HEAVY_MODULES)
+
+
+def test_import_time_budget(main_import_times):
+    elapsed_ms = main_import_times["main"] / 1000
+    assert elapsed_ms < IMPORT_BUDGET_MS, (
+        f"import main took {elapsed_ms:.1f} ms (budget {IMPORT_BUDGET_MS} ms)"
+    )
+
+
+def test_import_has_no_side_effects(tmp_path):
+    """Importing main must not create an app or touch the database."""
+    subprocess.run(
+        [sys.executable, "-c", "import main"],
+        cwd=ROOT,
+        env={**os.environ, "DB_URI": f"sqlite:///{tmp_path / 'never.db'}"},
+        check=True,
+    )
+    assert not (tmp_path / "never.db").exists()
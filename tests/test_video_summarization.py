@@ -0,0 +1,353 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import video_summarization as vs
+from video_summarization import PipelineTrace
+
+
+def test_trace_records_nested_spans(tmp_path):
+    trace = PipelineTrace(job="clip.mp4")
+    with trace.span("run"):
+        with trace.span("clip_scoring", frames=12) as span:
+            span["kept"] = 3
+
+    inner, outer = trace.spans
+    assert (inner["name"], inner["depth"], inner["frames"], inner["kept"]) == (
+        "clip_scoring",
+        1,
+        12,
+        3,
+    )
+    assert outer["name"] == "run" and outer["depth"] == 0
+    assert outer["duration_s"] >= inner["duration_s"]
+    assert inner["peak_rss_mb"] > 0
+
+    path = tmp_path / "trace.json"
+    trace.save(path)
+    assert json.loads(path.read_text())["job"] == "clip.mp4"
+
+
+def test_trace_can_be_reopened_and_extended(tmp_path):
+    path = tmp_path / "trace.json"
+    first = PipelineTrace(job="clip.mp4")
+    with first.span("snippet"):
+        pass
+    first.save(path)
+
+    reopened = PipelineTrace.load(path)
+    with reopened.span("mplug_caption", snippet=1):
+        pass
+    assert [s["name"] for s in reopened.spans] == ["snippet", "mplug_caption"]
+    assert reopened.spans[1]["start_s"] >= reopened.spans[0]["start_s"]
+
+
+def _touch_videos(folder, *names):
+    folder.mkdir()
+    for name in names:
+        (folder / name).write_bytes(b"")
+    return folder
+
+
+def test_ledger_lists_only_pending_videos(tmp_path):
+    dataset = _touch_videos(tmp_path / "dataset", "b.mp4", "a.MP4", "notes.txt")
+    ledger = tmp_path / "processed_videos.json"
+    assert vs.pending_videos(str(dataset), str(ledger)) == ["a.MP4", "b.mp4"]
+
+    vs.mark_processed(str(ledger), "a.MP4")
+    vs.mark_processed(str(ledger), "a.MP4")
+    assert json.loads(ledger.read_text()) == ["a.MP4"]
+    assert vs.pending_videos(str(dataset), str(ledger)) == ["b.mp4"]
+
+
+def test_batch_worker_count_is_bounded_by_memory(monkeypatch):
+    monkeypatch.setattr(vs, "estimate_job_mb", lambda path, resize_dim: 1000)
+    monkeypatch.setattr(vs.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(vs, "available_memory_mb", lambda: 3500)
+    assert vs.batch_worker_count(["a", "b", "c", "d", "e"]) == 3
+    assert vs.batch_worker_count(["a", "b", "c", "d", "e"], max_workers=2) == 2
+    assert vs.batch_worker_count(["a"]) == 1
+    monkeypatch.setattr(vs, "available_memory_mb", lambda: 200)
+    assert vs.batch_worker_count(["a", "b"]) == 1
+
+
+def test_batch_marks_only_successful_videos(tmp_path, monkeypatch):
+    pytest.importorskip("torch")
+    dataset = _touch_videos(tmp_path / "dataset", "good.mp4", "bad.mp4")
+    ledger = tmp_path / "processed_videos.json"
+    out_root = tmp_path / "summaries"
+    loaded = []
+
+    class FakeModels:
+        def __init__(self, device=None, **kwargs):
+            loaded.append(device)
+
+    class FakeSummarizer:
+        def __init__(self, video_path, prompt, out_dir, **kwargs):
+            self.video_path, self.out_dir = video_path, out_dir
+
+        def run(self):
+            snippet_dir = os.path.join(self.out_dir, "snippet_001")
+            os.makedirs(snippet_dir)
+            if "bad" in self.video_path:
+                raise RuntimeError("whisper crashed")
+            return [snippet_dir]
+
+    monkeypatch.setattr(vs, "PipelineModels", FakeModels)
+    monkeypatch.setattr(vs, "VideoSummarizer", FakeSummarizer)
+    monkeypatch.setattr(vs, "batch_worker_count", lambda paths, max_workers=None: 1)
+
+    outcome = vs.run_batch(str(dataset), str(out_root), str(ledger))
+
+    assert loaded == ["cpu"]  # one model load for the whole batch
+    assert outcome["failed"] == ["bad.mp4"]
+    assert [r["video"] for r in outcome["done"]] == ["good.mp4"]
+    assert json.loads(ledger.read_text()) == ["good.mp4"]
+    assert sorted(os.listdir(out_root)) == ["good"]  # no partial directory left behind
+    assert (out_root / "good" / "snippet_001").is_dir()
+
+
+def test_stage_keys_only_change_downstream(tmp_path):
+    def keys(**params):
+        summarizer = vs.VideoSummarizer.__new__(vs.VideoSummarizer)
+        summarizer.prompt, summarizer.top_k, summarizer.resize_dim = "cats", 5, (64, 36)
+        summarizer.pixel_thresh, summarizer.min_interval = 30, 10
+        summarizer.threshold_dot, summarizer.clip_backend = 0.98, "torch"
+        summarizer.keyframe_mode, summarizer.shot_reps = "dynamic", 3
+        summarizer.__dict__.update(params)
+        return summarizer.stage_keys()
+
+    base, tweaked = keys(), keys(threshold_dot=0.9)
+    assert [k for k in base if base[k] != tweaked[k]] == ["snippets"]
+    moved = keys(pixel_thresh=20)
+    assert [k for k in base if base[k] != moved[k]] == ["keyframes", "clip", "snippets"]
+    quantized = keys(clip_backend="int8")
+    assert [k for k in base if base[k] != quantized[k]] == ["clip", "snippets"]
+    shots = keys(keyframe_mode="shots")
+    assert [k for k in base if base[k] != shots[k]] == ["keyframes", "clip", "snippets"]
+
+
+class FakeWhisper:
+    calls = 0
+
+    def transcribe(self, audio_path, word_timestamps=True):
+        FakeWhisper.calls += 1
+        words = [{"word": "hi", "start": 0.1, "end": 0.2}]
+        return {"segments": [{"start": 0.0, "end": 0.25, "text": "hi", "words": words}]}
+
+
+def _fake_models():
+    standins = pytest.importorskip("benchmarks.standins")
+
+    class FakeModels:
+        device = "cpu"
+        clip_backend = "torch"
+
+        def __init__(self):
+            self.clip_model = standins.TinyClipModel()
+            self.clip_proc = standins.TinyClipProcessor()
+
+        encode_calls = 0
+
+        def encode_prompts(self, prompts):
+            FakeModels.encode_calls += 1
+            return np.concatenate(
+                [self.clip_model.random_prompt_embedding(seed=len(p)) for p in prompts]
+            )
+
+        def whisper_model(self):
+            return FakeWhisper()
+
+    return FakeModels()
+
+
+def test_rerun_reuses_completed_stages(tmp_path, monkeypatch):
+    from benchmarks.synthetic import make_video
+
+    models = _fake_models()
+    video = make_video(str(tmp_path / "clip.mp4"), seconds=2, size=(160, 90), fps=12)
+    monkeypatch.setattr(vs.AudioProcessor, "extract_audio", lambda self, *args: None)
+    calls = {"decode": 0, "embed": 0}
+    real_load, real_embed = vs.load_entire_video, vs.iter_clip_embeddings
+
+    def counting_load(*args, **kwargs):
+        calls["decode"] += 1
+        return real_load(*args, **kwargs)
+
+    def counting_embed(*args, **kwargs):
+        calls["embed"] += 1
+        return real_embed(*args, **kwargs)
+
+    monkeypatch.setattr(vs, "load_entire_video", counting_load)
+    monkeypatch.setattr(vs, "iter_clip_embeddings", counting_embed)
+    FakeWhisper.calls = 0
+    store = vs.ArtifactStore(str(tmp_path / "artifacts"))
+
+    def run(out, **params):
+        summarizer = vs.VideoSummarizer(
+            video, "cats", top_k=3, resize_dim=(80, 45), models=models,
+            out_dir=str(tmp_path / out), store=store, **params,
+        )
+        return summarizer.run()
+
+    first = run("first")
+    assert first and calls == {"decode": 1, "embed": 1} and FakeWhisper.calls == 1
+
+    again = run("again")
+    assert [os.path.basename(d) for d in again] == [os.path.basename(d) for d in first]
+    assert calls == {"decode": 1, "embed": 1} and FakeWhisper.calls == 1
+
+    run("tweaked", threshold_dot=0.5)
+    # Only the snippets are rebuilt: frames are decoded to write them, but the
+    # CLIP embeddings and the transcript come from the store.
+    assert calls == {"decode": 2, "embed": 1} and FakeWhisper.calls == 1
+
+    meta = json.loads((tmp_path / "again" / "snippet_001" / "metadata.json").read_text())
+    assert meta["artifact"]["video"] == store.video_hash(video)
+
+
+def test_aborted_stage_is_not_stored(tmp_path, monkeypatch):
+    from benchmarks.synthetic import make_video
+
+    video = make_video(str(tmp_path / "clip.mp4"), seconds=1, size=(160, 90), fps=12)
+    store = vs.ArtifactStore(str(tmp_path / "artifacts"))
+    monkeypatch.setattr(vs.VideoSummarizer, "_build_snippets", lambda self, *args: False)
+    summarizer = vs.VideoSummarizer(
+        video, "cats", resize_dim=(80, 45), models=_fake_models(),
+        out_dir=str(tmp_path / "out"), store=store,
+    )
+    assert summarizer.run() == []
+    video_hash = store.video_hash(video)
+    assert store.stage_dir(video_hash, "snippets", summarizer.stage_keys()["snippets"]) is None
+    assert not [n for n in os.listdir(tmp_path / "artifacts" / video_hash) if "snippets" in n]
+
+
+def test_concurrent_artifact_writes_do_not_collide(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    store = vs.ArtifactStore(str(tmp_path))
+
+    def write(i):
+        store.save_json("vid", "caption", "k", {"summary": "same"})
+        store.save_arrays("vid", "keyframes", "k", real_index=np.arange(i % 3 + 1))
+        with store.build_dir("vid", "snippets", "k") as tmp_dir:
+            (tmp_path / "vid" / os.path.basename(tmp_dir) / "done").write_text("1")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(write, range(32)))
+    assert store.load_json("vid", "caption", "k") == {"summary": "same"}
+    assert store.stage_dir("vid", "snippets", "k") is not None
+    assert not [n for n in os.listdir(tmp_path / "vid") if n.endswith(".tmp")]
+
+
+def test_embedding_store_is_float16_and_memory_mapped(tmp_path):
+    store = vs.ArtifactStore(str(tmp_path))
+    rows = np.eye(3, 4, dtype=np.float32)
+    with store.build_embeddings("vid", "clip", "k", [5, 9, 12], dim=4, model="m") as out:
+        out[:] = rows
+    embeddings, real_index = store.load_embeddings("vid", "clip", "k")
+    assert isinstance(embeddings, np.memmap) and embeddings.dtype == np.float16
+    assert real_index.tolist() == [5, 9, 12]
+    np.testing.assert_array_equal(embeddings, rows)
+    meta = json.loads((tmp_path / "vid" / "clip-k" / "meta.json").read_text())
+    assert meta == {"model": "m", "count": 3, "dim": 4, "dtype": "float16"}
+
+
+def test_prompt_scores_rank_all_prompts_at_once():
+    embeddings = np.array([[1, 0], [0, 1], [0.6, 0.8]], dtype=np.float16)
+    prompts = np.array([[1, 0], [0, 1]], dtype=np.float32)
+    scores = vs.prompt_scores(embeddings, prompts)
+    assert scores.shape == (3, 2)
+    assert scores[:, 0].argmax() == 0 and scores[:, 1].argmax() == 1
+
+
+def test_new_prompts_reuse_stored_embeddings(tmp_path, monkeypatch):
+    from benchmarks.synthetic import make_video
+
+    models = _fake_models()
+    video = make_video(str(tmp_path / "clip.mp4"), seconds=2, size=(160, 90), fps=12)
+    monkeypatch.setattr(vs.AudioProcessor, "extract_audio", lambda self, *args: None)
+    store = vs.ArtifactStore(str(tmp_path / "artifacts"))
+
+    def summarizer(out):
+        return vs.VideoSummarizer(
+            video, "cats", top_k=2, resize_dim=(80, 45), models=models,
+            out_dir=str(tmp_path / out), store=store,
+        )
+
+    summarizer("first").run()
+    embedded = []
+    monkeypatch.setattr(vs, "iter_clip_embeddings", lambda *args: embedded.append(args))
+    type(models).encode_calls = 0
+
+    results = summarizer("focus").run_prompts(["dogs", "a red car", "crowds"])
+
+    assert embedded == [] and type(models).encode_calls == 1
+    assert list(results) == ["dogs", "a red car", "crowds"]
+    for i, dirs in enumerate(results.values(), start=1):
+        assert dirs and all(f"prompt_{i:02d}" in d for d in dirs)
+    meta_path = tmp_path / "focus" / "prompt_02" / "snippet_001" / "metadata.json"
+    meta = json.loads(meta_path.read_text())
+    assert meta["prompt"] == "a red car"
+
+
+def test_decode_ranges_snap_to_keyframes():
+    assert vs.plan_decode_ranges(100, 4) == [(0, 25), (25, 50), (50, 75), (75, 100)]
+    keyframes = [0, 12, 24, 36, 48, 60, 72, 84, 96]
+    assert vs.plan_decode_ranges(100, 4, keyframes) == [
+        (0, 24),
+        (24, 48),
+        (48, 72),
+        (72, 100),
+    ]
+    # Short videos never get empty ranges.
+    assert vs.plan_decode_ranges(2, 8) == [(0, 1), (1, 2)]
+
+
+def test_parallel_decode_matches_serial_order(tmp_path):
+    from benchmarks.synthetic import make_video
+
+    video = make_video(str(tmp_path / "clip.mp4"), seconds=3, size=(160, 90), fps=12)
+    serial, fps = vs.load_entire_video(video, resize_dim=(80, 45))
+    assert vs.load_video_parallel(video, (80, 45), 3) is not None  # no serial fallback
+    parallel, parallel_fps = vs.load_entire_video(video, resize_dim=(80, 45), workers=3)
+
+    assert parallel_fps == fps and len(parallel) == len(serial) == 36
+    for (expected, idx), (frame, parallel_idx) in zip(serial, parallel):
+        assert parallel_idx == idx and np.array_equal(frame, expected)
+
+
+def test_parallel_decode_rejects_misaligned_ranges():
+    frames = np.arange(6, dtype=np.uint8).reshape(6, 1, 1, 1)
+    ranges = [(0, 3), (3, 6)]
+    good = {0: (0, 3, False, frames[3]), 3: (3, 6, False, None)}
+    assert vs.ranges_line_up(ranges, good, frames) == 6
+    # The seek reported another position.
+    assert vs.ranges_line_up(ranges, {**good, 3: (1, 6, False, None)}, frames) is None
+    # The seek reported the right position but the next range starts on other frames.
+    assert vs.ranges_line_up(ranges, {**good, 0: (0, 3, False, frames[1])}, frames) is None
+    # A middle range stopped early.
+    assert vs.ranges_line_up(ranges, {**good, 0: (0, 2, False, None)}, frames) is None
+    # The last range may end early when the container overstates the frame count.
+    assert vs.ranges_line_up(ranges, {**good, 3: (3, 5, False, None)}, frames) == 5
+
+
+def test_shot_keyframes_keep_a_few_frames_per_shot(tmp_path):
+    from benchmarks.synthetic import make_video
+
+    video = make_video(str(tmp_path / "clip.mp4"), seconds=8, size=(160, 90), fps=12, shots=4)
+    frames, _ = vs.load_entire_video(video, resize_dim=(160, 90))
+    keyframes, shots = vs.shot_keyframes(frames, per_shot=2)
+
+    assert shots == [(0, 24), (24, 48), (48, 72), (72, 96)]
+    assert [kf["real_index"] for kf in keyframes] == [6, 18, 30, 42, 54, 66, 78, 90]
+    assert len(keyframes) < len(vs.dynamic_extraction_in_memory(frames))
+
+
+def test_detect_shots_adapts_to_busy_shots():
+    calm = [0.01] * 20
+    busy = [0.3, 0.05] * 10  # fast motion: large but regular frame-to-frame distances
+    distances = np.array(calm + [0.9] + busy + [0.9] + calm, dtype=np.float32)
+    assert vs.detect_shots(distances) == [(0, 20), (20, 41), (41, 62)]
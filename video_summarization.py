@@ -0,0 +1,1735 @@
+"""
+Video summarization pipeline: dynamic keyframe extraction, CLIP scoring,
+diversity filtering, Whisper transcription and motion-aware snippet writing.
+
+This file is embedded in Compress_Algorithm.ipynb, which writes it out and
+runs it on Kaggle; keep the two in sync. Heavy model libraries (torch,
+transformers, whisper, pydub) are imported where they are used so the
+frame-level stages can be imported and benchmarked without them.
+"""
+
+# ======================
+# 1. Imports
+# ======================
+import os
+import sys
+import cv2
+import json
+import hashlib
+import time
+import shutil
+import subprocess
+import resource
+import tempfile
+import numpy as np
+from contextlib import contextmanager
+from tqdm.auto import tqdm
+from typing import List
+
+
+# ============================
+# 2. Stage Tracing
+# ============================
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux (the Kaggle runtime), bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _cuda_peak_mb(reset=False):
+    torch = sys.modules.get("torch")  # never import torch just to measure it
+    if torch is None or not torch.cuda.is_available():
+        return None
+    peak = torch.cuda.max_memory_allocated() / (1024 * 1024)
+    if reset:
+        torch.cuda.reset_peak_memory_stats()
+    return peak
+
+
+class PipelineTrace:
+    """
+    Collects timing and memory spans for one summarization job.
+
+    Each span costs a few clock reads and one getrusage() call, so tracing
+    is always on. The trace is written next to the snippets as trace.json
+    and posted back to the web app together with the summaries.
+    """
+
+    def __init__(self, job=None):
+        self.job = job
+        self.started_at = time.time()
+        self.spans = []
+        self._t0 = time.perf_counter()
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Times the enclosed block; the yielded dict can carry extra attributes."""
+        if self._depth == 0:
+            _cuda_peak_mb(reset=True)
+        self._depth += 1
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        rss_start = _peak_rss_mb()
+        try:
+            yield attrs
+        finally:
+            self._depth -= 1
+            record = {
+                "name": name,
+                "depth": self._depth,
+                "start_s": round(start - self._t0, 6),
+                "duration_s": round(time.perf_counter() - start, 6),
+                "cpu_s": round(time.process_time() - cpu_start, 6),
+                "peak_rss_mb": round(_peak_rss_mb(), 1),
+                "rss_growth_mb": round(_peak_rss_mb() - rss_start, 1),
+            }
+            gpu_peak = _cuda_peak_mb()
+            if gpu_peak is not None:
+                record["gpu_peak_mb"] = round(gpu_peak, 1)
+            record.update(attrs)
+            self.spans.append(record)
+
+    def to_dict(self):
+        return {
+            "job": self.job,
+            "started_at": self.started_at,
+            "total_s": round(time.perf_counter() - self._t0, 6),
+            "spans": self.spans,
+        }
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """Reopens a saved trace so a later stage (e.g. mPLUG) can append to it."""
+        with open(path) as f:
+            data = json.load(f)
+        trace = cls(job=data.get("job"))
+        trace.started_at = data.get("started_at", trace.started_at)
+        trace.spans = data.get("spans", [])
+        trace._t0 -= data.get("total_s", 0.0)
+        return trace
+
+
+# ============================
+# 3. Read Entire Video Into Memory
+# ============================
+def load_entire_video(video_path: str, resize_dim=(640, 240), workers=1):
+    if workers > 1:
+        loaded = load_video_parallel(video_path, resize_dim, workers)
+        if loaded is not None:
+            return loaded
+    print("[load_entire_video] Loading all frames into memory...")
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if fps <= 0:
+        fps = 30.0
+    frames_in_mem = []
+    idx = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame = cv2.resize(frame, resize_dim)
+        frames_in_mem.append((frame, idx))
+        idx += 1
+    cap.release()
+    print(f"[load_entire_video] Loaded {len(frames_in_mem)} frames total.")
+    return frames_in_mem, fps
+
+
+def keyframe_indices(video_path: str):
+    """
+    Display-order indices of the video's keyframes, read from packet flags
+    with ffprobe (no decoding). Returns None when ffprobe is unavailable.
+    """
+    if shutil.which("ffprobe") is None:
+        return None
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "packet=pts_time,flags",
+            "-of",
+            "csv=p=0",
+            video_path,
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    packets = []
+    for line in result.stdout.splitlines():
+        fields = line.split(",")
+        if len(fields) < 2 or fields[0] in ("", "N/A"):
+            continue
+        packets.append((float(fields[0]), "K" in fields[1]))
+    packets.sort()
+    return [i for i, (_, is_key) in enumerate(packets) if is_key]
+
+
+def plan_decode_ranges(frame_count: int, workers: int, keyframes=None):
+    """
+    Splits [0, frame_count) into up to `workers` contiguous ranges. With
+    keyframe indices, each boundary moves to the nearest keyframe so every
+    worker's seek lands exactly on a decodable frame.
+    """
+    bounds = [round(frame_count * i / workers) for i in range(1, workers)]
+    if keyframes:
+        bounds = [min(keyframes, key=lambda k: abs(k - b)) for b in bounds]
+    edges = sorted({0, frame_count, *(b for b in bounds if 0 < b < frame_count)})
+    return list(zip(edges, edges[1:]))
+
+
+def _decode_range(video_path, start, end, resize_dim, buffer_path, capacity, results):
+    cv2.setNumThreads(1)  # one decode process per core already
+    width, height = resize_dim
+    frames = np.memmap(buffer_path, dtype=np.uint8, mode="r+", shape=(capacity, height, width, 3))
+    cap = cv2.VideoCapture(video_path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    # Some containers only seek to the nearest keyframe; the parent discards the
+    # parallel decode if the reported position is not the one asked for.
+    seeked = int(round(cap.get(cv2.CAP_PROP_POS_FRAMES)))
+    idx = start
+    while idx < end:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames[idx] = cv2.resize(frame, resize_dim)
+        idx += 1
+    # Decode one frame past the range: the parent compares it with the first
+    # frame of the next range, which catches a seek that reported the right
+    # position but landed elsewhere. The last range also picks up frames past
+    # the container's frame count this way.
+    ret, frame = cap.read() if idx == end else (False, None)
+    boundary = cv2.resize(frame, resize_dim) if ret and end < capacity else None
+    more = bool(ret) and end == capacity
+    cap.release()
+    frames.flush()
+    results.put((start, seeked, idx, more, boundary))
+
+
+def ranges_line_up(ranges, decoded, frames):
+    """
+    Checks what the decode workers reported: each must have started where it
+    was asked to, read its whole range (only the last may end early) and
+    agree with its neighbour on the first frame of the next range. `decoded`
+    maps range start -> (seeked, stop, more, boundary frame). Returns the
+    number of decoded frames, or None if the ranges can't be trusted.
+    """
+    frame_count = len(frames)
+    total = 0
+    for start, end in ranges:
+        seeked, stop, more, boundary = decoded[start]
+        if seeked != start or start != total or more:
+            return None
+        if end < frame_count and (
+            stop != end or boundary is None or not np.array_equal(boundary, frames[end])
+        ):
+            return None
+        total = stop
+    return total
+
+
+def _shared_frame_dir():
+    """tmpfs when available, so the shared frame buffer never touches disk."""
+    return "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def load_video_parallel(video_path: str, resize_dim, workers: int):
+    """
+    Decodes contiguous frame ranges in `workers` spawned processes, each
+    resizing its frames straight into one shared memory-mapped buffer that
+    the parent then views without copying. Workers are spawned rather than
+    forked, so this is safe after Whisper or CUDA have started threads.
+    Returns the same (frames_in_mem, fps) as load_entire_video, or None when
+    the container's frame count or seeking can't be trusted, so the caller
+    decodes serially instead.
+    """
+    import multiprocessing
+    import queue
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if fps <= 0:
+        fps = 30.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if frame_count <= 0:
+        return None
+
+    print(
+        f"[load_video_parallel] Decoding {frame_count} frames with {workers} workers..."
+    )
+    width, height = resize_dim
+    shape = (frame_count, height, width, 3)
+    fd, buffer_path = tempfile.mkstemp(suffix=".frames", dir=_shared_frame_dir())
+    os.close(fd)
+    try:
+        frames = np.memmap(buffer_path, dtype=np.uint8, mode="w+", shape=shape)
+        ranges = plan_decode_ranges(frame_count, workers, keyframe_indices(video_path))
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(
+                target=_decode_range,
+                args=(video_path, start, end, resize_dim, buffer_path, frame_count, results),
+            )
+            for start, end in ranges
+        ]
+        for proc in procs:
+            proc.start()
+        # Drain the queue before joining: a worker does not exit until its
+        # boundary frame has been read.
+        decoded = {}
+        while len(decoded) < len(procs):
+            try:
+                start, seeked, stop, more, boundary = results.get(timeout=1)
+            except queue.Empty:
+                if any(proc.exitcode not in (None, 0) for proc in procs):
+                    break
+                continue
+            decoded[start] = (seeked, stop, more, boundary)
+        for proc in procs:
+            proc.join()
+        if len(decoded) < len(procs) or any(proc.exitcode != 0 for proc in procs):
+            print("[load_video_parallel] A decode worker failed, decoding serially.")
+            return None
+    finally:
+        # The parent's mapping outlives the file name.
+        try:
+            os.remove(buffer_path)
+        except OSError:
+            pass
+
+    total = ranges_line_up(ranges, decoded, frames)
+    if total is None:
+        print("[load_video_parallel] Ranges did not line up, decoding serially.")
+        return None
+    frames = np.asarray(frames)
+    frames_in_mem = [(frames[idx], idx) for idx in range(total)]
+    print(f"[load_video_parallel] Loaded {total} frames total.")
+    return frames_in_mem, fps
+
+
+# ============================
+# 4. Dynamic Frame Extraction (In Memory)
+# ============================
+def dynamic_extraction_in_memory(
+    frames_in_mem: List[tuple], pixel_thresh=30, min_interval=10
+):
+    print("[dynamic_extraction_in_memory] Starting dynamic extraction...")
+    keyframes = []
+    prev_gray = None
+    count = 0
+    for frame, real_idx in frames_in_mem:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        diff_val = 0.0
+        if prev_gray is not None:
+            diff_img = cv2.absdiff(prev_gray, gray)
+            diff_val = float(np.mean(diff_img))
+        if diff_val > pixel_thresh or (count % min_interval == 0):
+            keyframes.append(
+                {"frame": frame, "real_index": real_idx, "diff_score": diff_val}
+            )
+            prev_gray = gray
+        elif prev_gray is None:
+            prev_gray = gray
+        count += 1
+    print(f"[dynamic_extraction_in_memory] Extracted {len(keyframes)} keyframes total.")
+    return keyframes
+
+
+def frame_histogram_distances(frames_in_mem: List[tuple], thumb=(64, 36), bins=(16, 4)):
+    """
+    Bhattacharyya distance between the hue/saturation histograms of each
+    frame and the one before it (0 for the first frame). Histograms are taken
+    from small thumbnails, so this costs far less than decoding did.
+    """
+    distances = np.zeros(len(frames_in_mem), dtype=np.float32)
+    prev_hist = None
+    for i, (frame, _) in enumerate(frames_in_mem):
+        small = cv2.resize(frame, thumb, interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, list(bins), [0, 180, 0, 256])
+        cv2.normalize(hist, hist)
+        if prev_hist is not None:
+            distances[i] = cv2.compareHist(prev_hist, hist, cv2.HISTCMP_BHATTACHARYYA)
+        prev_hist = hist
+    return distances
+
+
+def detect_shots(
+    distances: np.ndarray, window=48, k=4.0, min_distance=0.2, min_shot_len=6
+):
+    """
+    Splits frames into shots at distance spikes. A cut needs a distance above
+    both `min_distance` and mean + k * std of the previous `window` distances
+    inside the current shot, so busy shots need a bigger jump than static
+    ones. Returns [(start, end)] frame ranges, end exclusive.
+    """
+    cuts = [0]
+    for i in range(1, len(distances)):
+        if i - cuts[-1] < min_shot_len:
+            continue
+        lo = max(cuts[-1] + 1, i - window)
+        recent = distances[lo:i]
+        threshold = max(min_distance, float(recent.mean() + k * recent.std()))
+        if distances[i] > threshold:
+            cuts.append(i)
+    return list(zip(cuts, cuts[1:] + [len(distances)]))
+
+
+def shot_keyframes(
+    frames_in_mem: List[tuple], per_shot=3, max_gap=240, **detect_kwargs
+):
+    """
+    Segments the video into shots and keeps `per_shot` evenly spaced frames of
+    each (more for long takes, so no two are over `max_gap` frames apart).
+    Returns keyframes shaped like dynamic_extraction_in_memory's, plus the shots.
+    """
+    print("[shot_keyframes] Segmenting shots...")
+    distances = frame_histogram_distances(frames_in_mem)
+    shots = detect_shots(distances, **detect_kwargs)
+    keyframes = []
+    for start, end in shots:
+        length = end - start
+        count = min(length, max(per_shot, -(-length // max_gap)))
+        for j in range(count):
+            pos = start + (2 * j + 1) * length // (2 * count)
+            frame, real_idx = frames_in_mem[pos]
+            keyframes.append(
+                {
+                    "frame": frame,
+                    "real_index": real_idx,
+                    "diff_score": float(distances[pos]),
+                }
+            )
+    print(
+        f"[shot_keyframes] {len(shots)} shots => {len(keyframes)} keyframes "
+        f"from {len(frames_in_mem)} frames."
+    )
+    return keyframes, shots
+
+
+# ============================
+# 5. CLIP Scoring
+# ============================
+def iter_clip_embeddings(keyframes: List[dict], clip_model, clip_proc, device):
+    """Yields the L2-normalized CLIP image embedding of every keyframe, in order."""
+    import torch
+    from torch.nn.functional import normalize
+
+    for kf in tqdm(keyframes, desc="CLIP scoring"):
+        inp = clip_proc(images=kf["frame"], return_tensors="pt").to(device)
+        with torch.no_grad():
+            img_feat = clip_model.get_image_features(**inp)
+        yield normalize(img_feat, p=2, dim=1).cpu().numpy()[0]
+
+
+def clip_embed_keyframes(keyframes: List[dict], clip_model, clip_proc, device):
+    return np.stack(
+        list(iter_clip_embeddings(keyframes, clip_model, clip_proc, device))
+    )
+
+
+def prompt_scores(embeddings: np.ndarray, prompt_embs: np.ndarray):
+    """Scores every frame against every prompt: one (frames x prompts) product."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return (
+        embeddings
+        @ np.asarray(prompt_embs, dtype=np.float32).reshape(-1, embeddings.shape[1]).T
+    )
+
+
+def score_keyframes(
+    keyframes: List[dict], embeddings: np.ndarray, prompt_emb=None, scores=None
+):
+    """Attaches embeddings and scores to the keyframes, best first."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if scores is None:
+        scores = prompt_scores(embeddings, prompt_emb)[:, 0]
+    for kf, emb, score in zip(keyframes, embeddings, scores):
+        kf["clip_emb"] = emb
+        kf["clip_score"] = float(score)
+    results = sorted(keyframes, key=lambda x: x["clip_score"], reverse=True)
+    return results
+
+
+def clip_score_keyframes(
+    keyframes: List[dict], prompt_emb: np.ndarray, clip_model, clip_proc, device
+):
+    print("[clip_score_keyframes] Scoring with CLIP...")
+    embeddings = clip_embed_keyframes(keyframes, clip_model, clip_proc, device)
+    results = score_keyframes(keyframes, embeddings, prompt_emb)
+    print("[clip_score_keyframes] Done. Sorted descending by clip_score.")
+    return results
+
+
+# ============================
+# 6. Diversity Filter (Skip Approach)
+# ============================
+def diversity_skip(keyframes: List[dict], threshold_dot=0.98):
+    print(f"[diversity_skip] threshold_dot={threshold_dot}")
+    final_list = []
+    for kf in keyframes:
+        emb = kf["clip_emb"]
+        keep = True
+        for chosen in final_list:
+            dot_ = float(np.dot(emb, chosen["clip_emb"]))
+            if dot_ > threshold_dot:
+                keep = False
+                break
+        if keep:
+            final_list.append(kf)
+    print(f"[diversity_skip] After skip => {len(final_list)} frames remain.")
+    return final_list
+
+
+# ============================
+# 7. Audio with Whisper
+# ============================
+class AudioProcessor:
+    def __init__(self, model=None):
+        self.model = model
+        self.audio = None
+        self.word_timestamps = []
+        self.segments = []
+
+    def extract_audio(self, video_path: str, audio_path=None):
+        # Parallel workers each need their own scratch file.
+        audio_path = audio_path or "/kaggle/working/tmp_audio.wav"
+        os.system(
+            f'ffmpeg -i "{video_path}" -vn -acodec pcm_s16le -ar 16000 -ac 1 "{audio_path}" -y'
+        )
+        from pydub import AudioSegment
+
+        self.audio = AudioSegment.from_wav(audio_path)
+        return audio_path
+
+    def transcribe(self, audio_path: str):
+        if self.model is None:
+            self.model = load_whisper()
+        print("[AudioProcessor] Transcribing with Whisper 'medium' model...")
+        result = self.model.transcribe(audio_path, word_timestamps=True)
+        self.word_timestamps = []
+        for seg in result["segments"]:
+            self.word_timestamps.extend(seg.get("words", []))
+        self.segments = []
+        for seg in result["segments"]:
+            self.segments.append(
+                {"start": seg["start"], "end": seg["end"], "text": seg["text"]}
+            )
+
+    def extract_and_transcribe(self, video_path: str, audio_path=None):
+        self.transcribe(self.extract_audio(video_path, audio_path))
+
+    def transcript(self):
+        return {"segments": self.segments, "words": self.word_timestamps}
+
+    def load_transcript(self, transcript):
+        self.segments = transcript["segments"]
+        self.word_timestamps = transcript["words"]
+
+    def get_audio_snippet(self, start_f, end_f, fps):
+        if self.audio is None:
+            return None
+        start_ms = (start_f / fps) * 1000
+        end_ms = (end_f / fps) * 1000
+        if end_ms <= start_ms or start_ms >= len(self.audio):
+            return None
+        if end_ms > len(self.audio):
+            end_ms = len(self.audio)
+        return self.audio[start_ms:end_ms]
+
+
+# ============================
+# 8. Snippet Generation
+# ============================
+def generate_snippet(frames_in_mem: List[tuple], start_f: int, end_f: int):
+    snippet_frames = []
+    for frm, idx in frames_in_mem:
+        if idx >= start_f and idx <= end_f:
+            snippet_frames.append(frm)
+    return snippet_frames
+
+
+def measure_local_motion_snippet(
+    snippet_frames: List[np.ndarray], resize_dim=(640, 360)
+):
+    if len(snippet_frames) < 2:
+        return 0.0
+    dis_flow = cv2.DISOpticalFlow_create(cv2.DISOPTICAL_FLOW_PRESET_FAST)
+    gray_list = []
+    for frm in snippet_frames:
+        g = cv2.resize(frm, resize_dim)
+        g = cv2.cvtColor(g, cv2.COLOR_BGR2GRAY)
+        gray_list.append(g)
+    prev = gray_list[0]
+    mags = []
+    for g2 in gray_list[1:]:
+        flow = dis_flow.calc(prev, g2, None)
+        fx, fy = flow[..., 0], flow[..., 1]
+        mag = np.sqrt(fx**2 + fy**2)
+        mags.append(float(np.mean(mag)))
+        prev = g2
+    return float(np.mean(mags))
+
+
+def write_snippet_video(
+    out_path: str, snippet_frames: List[np.ndarray], fps, resize_dim
+):
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    outv = cv2.VideoWriter(out_path, fourcc, fps, (resize_dim[0], resize_dim[1]))
+    for frm in snippet_frames:
+        resized = cv2.resize(frm, resize_dim)
+        outv.write(resized)
+    outv.release()
+
+
+# ============================
+# 9. Stage Artifacts
+# ============================
+ARTIFACTS_DIR = "/kaggle/working/artifacts"
+# Bump when a stage's output format or algorithm changes to invalidate old artifacts.
+ARTIFACT_VERSION = 2
+
+
+class BuildAborted(Exception):
+    """Raised inside ArtifactStore.build_dir to discard a stage that produced nothing."""
+
+
+class ArtifactStore:
+    """
+    Persists each stage's output under <root>/<video hash>/<stage>-<key>.
+
+    A stage key hashes the stage's parameters together with the keys of the
+    stages it was computed from, so changing one parameter (say
+    threshold_dot) only misses the cache for that stage and everything
+    downstream of it. Files are written to a temporary name and renamed, so
+    an interrupted run never leaves a truncated artifact behind.
+    """
+
+    def __init__(self, root=ARTIFACTS_DIR):
+        self.root = root
+        self._video_hashes = {}
+
+    def video_hash(self, video_path):
+        stat = os.stat(video_path)
+        cache_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime)
+        if cache_key not in self._video_hashes:
+            digest = hashlib.sha256()
+            with open(video_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            self._video_hashes[cache_key] = digest.hexdigest()[:16]
+        return self._video_hashes[cache_key]
+
+    @staticmethod
+    def key(stage, upstream=(), **params):
+        if isinstance(upstream, str):
+            upstream = (upstream,)
+        payload = json.dumps(
+            [ARTIFACT_VERSION, stage, list(upstream), params],
+            sort_keys=True,
+            default=list,
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def path(self, video, stage, key, ext=""):
+        return os.path.join(self.root, video, f"{stage}-{key}{ext}")
+
+    @staticmethod
+    def _tmp_file(path):
+        """Opens a unique scratch file next to `path`; returns (file object, name)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp"
+        )
+        return os.fdopen(fd, "wb"), tmp_path
+
+    def load_json(self, video, stage, key):
+        path = self.path(video, stage, key, ".json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def save_json(self, video, stage, key, data):
+        path = self.path(video, stage, key, ".json")
+        f, tmp_path = self._tmp_file(path)
+        with f:
+            f.write(json.dumps(data, indent=2).encode("utf-8"))
+        os.replace(tmp_path, path)
+
+    def load_arrays(self, video, stage, key):
+        path = self.path(video, stage, key, ".npz")
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    def save_arrays(self, video, stage, key, **arrays):
+        path = self.path(video, stage, key, ".npz")
+        f, tmp_path = self._tmp_file(path)
+        with f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    def load_embeddings(self, video, stage, key):
+        """Memory-maps a stored embedding matrix; returns (embeddings, real_index)."""
+        path = self.stage_dir(video, stage, key)
+        if path is None:
+            return None
+        embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        real_index = np.load(os.path.join(path, "real_index.npy"))
+        return embeddings, real_index
+
+    @contextmanager
+    def build_embeddings(self, video, stage, key, real_index, dim, **meta):
+        """
+        Yields a float16 memory-mapped (frames x dim) matrix to fill row by row;
+        row i belongs to frame real_index[i]. Stored next to it are the frame
+        indices and a meta.json describing the matrix.
+        """
+        with self.build_dir(video, stage, key) as tmp_dir:
+            np.save(os.path.join(tmp_dir, "real_index.npy"), np.asarray(real_index))
+            embeddings = np.lib.format.open_memmap(
+                os.path.join(tmp_dir, "embeddings.npy"),
+                mode="w+",
+                dtype=np.float16,
+                shape=(len(real_index), dim),
+            )
+            yield embeddings
+            embeddings.flush()
+            del embeddings
+            meta.update(count=len(real_index), dim=dim, dtype="float16")
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump(meta, f, indent=2)
+
+    def stage_dir(self, video, stage, key):
+        """Returns the directory of a completed directory artifact, or None."""
+        path = self.path(video, stage, key)
+        return path if os.path.isdir(path) else None
+
+    @contextmanager
+    def build_dir(self, video, stage, key):
+        """
+        Yields a scratch directory that becomes the artifact on success. Raise
+        BuildAborted inside the block to drop it without storing anything.
+        """
+        path = self.path(video, stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = tempfile.mkdtemp(
+            dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp"
+        )
+        try:
+            yield tmp_path
+        except BuildAborted:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        # The key fixes the content, so an artifact another writer stored first
+        # is kept; renaming onto it would fail, and deleting it could pull it
+        # out from under a reader.
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+
+
+# ============================
+# 10. Model Loading
+# ============================
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+WHISPER_MODEL_NAME = "medium"
+
+
+# "torch" runs the fp32 model as loaded; "int8" and "onnx" are CPU backends.
+CLIP_BACKENDS = ("torch", "int8", "onnx")
+ONNX_CACHE_DIR = "/kaggle/working/onnx"
+
+
+def load_whisper(device=None):
+    import whisper
+
+    return whisper.load_model(WHISPER_MODEL_NAME, device=device)
+
+
+def quantize_clip(clip_model):
+    """Dynamic int8 quantization of every Linear layer (attention and MLP)."""
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+
+    return quantize_dynamic(clip_model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def onnx_paths(model_name=CLIP_MODEL_NAME, cache_dir=ONNX_CACHE_DIR):
+    base = os.path.join(cache_dir, model_name.replace("/", "--"))
+    return {"image": f"{base}-image.onnx", "text": f"{base}-text.onnx"}
+
+
+def export_clip_onnx(clip_model, model_name=CLIP_MODEL_NAME, cache_dir=ONNX_CACHE_DIR):
+    """Exports the image and text encoders once; later calls reuse the cached files."""
+    import torch
+
+    class ImageEncoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return self.model.get_image_features(pixel_values=pixel_values)
+
+    class TextEncoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model.get_text_features(
+                input_ids=input_ids, attention_mask=attention_mask
+            )
+
+    paths = onnx_paths(model_name, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    clip_model = clip_model.eval().cpu()
+    exports = {
+        "image": (
+            ImageEncoder(clip_model),
+            (torch.zeros(1, 3, 224, 224),),
+            ["pixel_values"],
+            {"pixel_values": {0: "batch"}},
+        ),
+        "text": (
+            TextEncoder(clip_model),
+            (torch.ones(1, 8, dtype=torch.long), torch.ones(1, 8, dtype=torch.long)),
+            ["input_ids", "attention_mask"],
+            {
+                "input_ids": {0: "batch", 1: "tokens"},
+                "attention_mask": {0: "batch", 1: "tokens"},
+            },
+        ),
+    }
+    for name, (module, args, input_names, dynamic_axes) in exports.items():
+        if os.path.exists(paths[name]):
+            continue
+        print(f"[export_clip_onnx] Exporting the {name} encoder to {paths[name]}")
+        tmp_dir = tempfile.mkdtemp(dir=cache_dir, suffix=".tmp")
+        try:
+            tmp_path = os.path.join(tmp_dir, os.path.basename(paths[name]))
+            torch.onnx.export(
+                module,
+                args,
+                tmp_path,
+                input_names=input_names,
+                output_names=["features"],
+                dynamic_axes={**dynamic_axes, "features": {0: "batch"}},
+                opset_version=18,
+            )
+            # The exporter may keep the weights in side files next to the graph
+            # (<name>.onnx.data), referenced by name. Move them first: the graph
+            # file appearing is what marks the export as complete.
+            for side_file in os.listdir(tmp_dir):
+                if side_file != os.path.basename(tmp_path):
+                    os.replace(os.path.join(tmp_dir, side_file), os.path.join(cache_dir, side_file))
+            os.replace(tmp_path, paths[name])
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return paths
+
+
+class OnnxClip:
+    """
+    CLIP encoders running on ONNX Runtime, with the get_image_features /
+    get_text_features calls of the transformers model so the pipeline code
+    does not change.
+    """
+
+    def __init__(self, paths, threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        providers = ["CPUExecutionProvider"]
+        self.image = ort.InferenceSession(paths["image"], options, providers=providers)
+        self.text = ort.InferenceSession(paths["text"], options, providers=providers)
+
+    def get_image_features(self, pixel_values):
+        import torch
+
+        (features,) = self.image.run(None, {"pixel_values": pixel_values.numpy()})
+        return torch.from_numpy(features)
+
+    def get_text_features(self, input_ids, attention_mask, **kwargs):
+        import torch
+
+        inputs = {
+            "input_ids": input_ids.numpy(),
+            "attention_mask": attention_mask.numpy(),
+        }
+        (features,) = self.text.run(None, inputs)
+        return torch.from_numpy(features)
+
+
+def convert_clip(
+    backend,
+    clip_model=None,
+    threads=None,
+    model_name=CLIP_MODEL_NAME,
+    cache_dir=ONNX_CACHE_DIR,
+):
+    """
+    Returns the CLIP model for `backend`, loading fp32 weights only when
+    needed: a cached ONNX export is used without touching them.
+    """
+    if backend not in CLIP_BACKENDS:
+        raise ValueError(
+            f"Unknown CLIP backend {backend!r}; choose from {CLIP_BACKENDS}"
+        )
+    if threads and backend != "onnx":
+        import torch
+
+        torch.set_num_threads(threads)
+    paths = onnx_paths(model_name, cache_dir)
+    if backend == "onnx":
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "The 'onnx' CLIP backend needs ONNX Runtime and the exporter: "
+                "pip install onnxruntime onnx onnxscript"
+            ) from e
+        if all(os.path.exists(p) for p in paths.values()):
+            return OnnxClip(paths, threads)
+    if clip_model is None:
+        from transformers import CLIPModel
+
+        clip_model = CLIPModel.from_pretrained(model_name)
+    if backend == "int8":
+        return quantize_clip(clip_model)
+    if backend == "onnx":
+        return OnnxClip(export_clip_onnx(clip_model, model_name, cache_dir), threads)
+    return clip_model
+
+
+class PipelineModels:
+    """
+    CLIP and Whisper for one process. A batch worker builds this once and
+    reuses it for every video it summarizes; Whisper is loaded on first use
+    so a single run can still free CLIP before transcription starts.
+
+    `clip_backend` picks how CLIP runs: the fp32 PyTorch model ("torch"), or
+    on CPU a dynamically int8-quantized copy ("int8") or an ONNX Runtime
+    export ("onnx"). `threads` sets the intra-op thread count.
+    """
+
+    def __init__(self, device=None, clip_backend="torch", threads=None):
+        import torch
+        from transformers import CLIPProcessor
+
+        self.whisper_device = device
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        if clip_backend != "torch":
+            self.device = "cpu"  # quantized and ONNX encoders run on the CPU
+        self.clip_backend = clip_backend
+        print(f"[PipelineModels] Loading CLIP ({clip_backend}) on {self.device}.")
+        self.clip_model = convert_clip(clip_backend, threads=threads)
+        if clip_backend == "torch":
+            self.clip_model = self.clip_model.to(self.device)
+        self.clip_proc = CLIPProcessor.from_pretrained(CLIP_MODEL_NAME)
+        self.whisper = None
+        self._prompt_embs = {}
+
+    def encode_prompts(self, prompts):
+        """Returns one normalized text embedding per prompt, encoding new ones in one batch."""
+        missing = [p for p in dict.fromkeys(prompts) if p not in self._prompt_embs]
+        if missing:
+            import torch
+            from torch.nn.functional import normalize
+
+            text_inp = self.clip_proc(
+                text=missing, return_tensors="pt", padding=True
+            ).to(self.device)
+            with torch.no_grad():
+                txt_feat = self.clip_model.get_text_features(**text_inp)
+            for prompt, emb in zip(
+                missing, normalize(txt_feat, p=2, dim=1).cpu().numpy()
+            ):
+                self._prompt_embs[prompt] = emb
+        return np.stack([self._prompt_embs[p] for p in prompts])
+
+    def whisper_model(self):
+        if self.whisper is None:
+            self.whisper = load_whisper(device=self.whisper_device)
+        return self.whisper
+
+    def release_clip(self):
+        import torch
+
+        self.clip_model = None
+        self.clip_proc = None
+        if self.device.startswith("cuda"):
+            torch.cuda.empty_cache()
+
+
+# ============================
+# 11. Full Summarizer
+# ============================
+class VideoSummarizer:
+    """
+    Runs the pipeline stage by stage, reusing every stage output already in
+    the artifact store: keyframes, CLIP embeddings, the Whisper transcript
+    and the finished snippets. Frames are decoded and models loaded only when
+    a stage actually has to be recomputed.
+    """
+
+    def __init__(
+        self,
+        video_path,
+        prompt,
+        top_k=5,
+        resize_dim=(640, 360),
+        trace=None,
+        models=None,
+        out_dir="/kaggle/working/snippets",
+        store=None,
+        pixel_thresh=30,
+        min_interval=10,
+        keyframe_mode="dynamic",
+        shot_reps=3,
+        threshold_dot=0.98,
+        clip_backend="torch",
+        clip_threads=None,
+        decode_workers=1,
+    ):
+        self.video_path = video_path
+        self.prompt = prompt
+        self.top_k = top_k
+        self.resize_dim = resize_dim
+        self.pixel_thresh = pixel_thresh
+        self.min_interval = min_interval
+        # "shots" keeps a few frames per detected shot instead of every
+        # changed frame, so far fewer frames reach CLIP.
+        self.keyframe_mode = keyframe_mode
+        self.shot_reps = shot_reps
+        self.threshold_dot = threshold_dot
+        # Backends embed slightly differently, so each gets its own embeddings.
+        self.clip_backend = models.clip_backend if models else clip_backend
+        self.clip_threads = clip_threads
+        self.decode_workers = decode_workers
+        self.out_dir = out_dir
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.trace = trace or PipelineTrace(job=os.path.basename(video_path))
+        self.store = store or ArtifactStore()
+        # Models passed in are shared with other videos and must outlive this run.
+        self.owns_models = models is None
+        self._models = models
+        self._frames = None
+        self._prompt_emb = None
+        self._ranked = None
+        self.audio_proc = AudioProcessor()
+
+    @property
+    def frames_in_mem(self):
+        if self._frames is None:
+            with self.trace.span("load_video") as span:
+                self._frames, self.fps = load_entire_video(
+                    self.video_path,
+                    resize_dim=self.resize_dim,
+                    workers=self.decode_workers,
+                )
+                span["frames"] = len(self._frames)
+                span["workers"] = self.decode_workers
+            self.total_frames = len(self._frames)
+        return self._frames
+
+    @property
+    def models(self):
+        if self._models is None:
+            with self.trace.span("load_clip"):
+                self._models = PipelineModels(
+                    clip_backend=self.clip_backend, threads=self.clip_threads
+                )
+        return self._models
+
+    @property
+    def device(self):
+        return self.models.device
+
+    @property
+    def prompt_emb(self):
+        if self._prompt_emb is None:
+            with self.trace.span("encode_prompt"):
+                self._prompt_emb = self.models.encode_prompts([self.prompt])
+        return self._prompt_emb
+
+    def stage_keys(self):
+        keys = {}
+        if self.keyframe_mode == "shots":
+            extraction = {"mode": "shots", "per_shot": self.shot_reps}
+        else:
+            extraction = {
+                "pixel_thresh": self.pixel_thresh,
+                "min_interval": self.min_interval,
+            }
+        keys["keyframes"] = ArtifactStore.key(
+            "keyframes", resize_dim=self.resize_dim, **extraction
+        )
+        keys["clip"] = ArtifactStore.key(
+            "clip",
+            keys["keyframes"],
+            model=CLIP_MODEL_NAME,
+            backend=self.clip_backend,
+        )
+        keys["transcript"] = ArtifactStore.key("transcript", model=WHISPER_MODEL_NAME)
+        keys["snippets"] = ArtifactStore.key(
+            "snippets",
+            (keys["clip"], keys["transcript"]),
+            prompt=self.prompt,
+            threshold_dot=self.threshold_dot,
+            top_k=self.top_k,
+        )
+        return keys
+
+    def run(self):
+        with self.trace.span("run"):
+            results = self._run()
+        self.trace.save(os.path.join(self.out_dir, "trace.json"))
+        return results
+
+    def run_prompts(self, prompts):
+        """
+        Summarizes the video once per prompt into out_dir/prompt_NN/ and returns
+        {prompt: snippet dirs}. All prompts are encoded in one batch and ranked
+        against the stored frame embeddings with one matrix product, so only
+        diversity filtering and snippet writing run per prompt.
+        """
+        base_dir = self.out_dir
+        results = {}
+        with self.trace.span("run", prompts=len(prompts)):
+            video = self.store.video_hash(self.video_path)
+            keyframes, embeddings = self._ranked_inputs(video, self.stage_keys())
+            if not keyframes:
+                print("[VideoSummarizer] No frames after dynamic extraction, aborting.")
+                return {prompt: [] for prompt in prompts}
+            with self.trace.span("encode_prompt", prompts=len(prompts)):
+                prompt_embs = self.models.encode_prompts(prompts)
+            with self.trace.span("rank_prompts", frames=len(keyframes)):
+                scores = prompt_scores(embeddings, prompt_embs)
+            for i, prompt in enumerate(prompts):
+                self.prompt, self._prompt_emb = prompt, prompt_embs[i][None]
+                self.out_dir = os.path.join(base_dir, f"prompt_{i + 1:02d}")
+                os.makedirs(self.out_dir, exist_ok=True)
+                results[prompt] = self._run(scores=scores[:, i])
+        self.out_dir = base_dir
+        self.trace.save(os.path.join(self.out_dir, "trace.json"))
+        return results
+
+    def _run(self, scores=None):
+        video = self.store.video_hash(self.video_path)
+        keys = self.stage_keys()
+        snippet_root = self.store.stage_dir(video, "snippets", keys["snippets"])
+        if snippet_root is None:
+            with self.store.build_dir(video, "snippets", keys["snippets"]) as tmp_root:
+                if not self._build_snippets(video, keys, tmp_root, scores):
+                    raise BuildAborted()
+            snippet_root = self.store.stage_dir(video, "snippets", keys["snippets"])
+            if snippet_root is None:  # nothing to store, so nothing to reuse next time
+                return []
+        else:
+            with self.trace.span("snippets", cached=True):
+                pass
+            print("[VideoSummarizer] Reusing snippets from", snippet_root)
+        results = []
+        for name in sorted(os.listdir(snippet_root)):
+            if name.startswith("snippet_"):
+                dest = os.path.join(self.out_dir, name)
+                shutil.copytree(
+                    os.path.join(snippet_root, name), dest, dirs_exist_ok=True
+                )
+                results.append(dest)
+        return results
+
+    def _keyframes(self, video, key):
+        stage = (
+            "shot_segmentation"
+            if self.keyframe_mode == "shots"
+            else "dynamic_extraction"
+        )
+        cached = self.store.load_arrays(video, "keyframes", key)
+        if cached is not None:
+            with self.trace.span(stage, cached=True) as span:
+                span["keyframes"] = len(cached["real_index"])
+            return [
+                {"real_index": int(i), "diff_score": float(d)}
+                for i, d in zip(cached["real_index"], cached["diff_score"])
+            ]
+        frames = self.frames_in_mem
+        shots = np.zeros((0, 2), dtype=np.int64)
+        with self.trace.span(stage, frames=len(frames)) as span:
+            if self.keyframe_mode == "shots":
+                keyframes, shot_ranges = shot_keyframes(frames, per_shot=self.shot_reps)
+                shots = np.array(shot_ranges, dtype=np.int64).reshape(-1, 2)
+                span["shots"] = len(shots)
+            else:
+                keyframes = dynamic_extraction_in_memory(
+                    frames,
+                    pixel_thresh=self.pixel_thresh,
+                    min_interval=self.min_interval,
+                )
+            span["keyframes"] = len(keyframes)
+        self.store.save_arrays(
+            video,
+            "keyframes",
+            key,
+            real_index=np.array([kf["real_index"] for kf in keyframes], dtype=np.int64),
+            diff_score=np.array(
+                [kf["diff_score"] for kf in keyframes], dtype=np.float32
+            ),
+            shots=shots,
+        )
+        return keyframes
+
+    def _clip_embeddings(self, video, key, keyframes):
+        """
+        Returns the (keyframes x dim) float16 embedding matrix, memory-mapped from
+        the store. On a miss the rows are written into the store as frames are
+        scored, so no second copy of the matrix is held in memory.
+        """
+        cached = self.store.load_embeddings(video, "clip", key)
+        if cached is not None:
+            with self.trace.span("clip_embedding", frames=len(keyframes), cached=True):
+                pass
+            return cached[0]
+        for kf in keyframes:
+            if "frame" not in kf:
+                kf["frame"] = self.frames_in_mem[kf["real_index"]][0]
+        real_index = np.array([kf["real_index"] for kf in keyframes], dtype=np.int64)
+        with self.trace.span(
+            "clip_embedding", frames=len(keyframes), device=self.device
+        ):
+            vectors = iter_clip_embeddings(
+                keyframes, self.models.clip_model, self.models.clip_proc, self.device
+            )
+            first = next(vectors)
+            with self.store.build_embeddings(
+                video,
+                "clip",
+                key,
+                real_index,
+                dim=len(first),
+                model=CLIP_MODEL_NAME,
+                backend=self.clip_backend,
+            ) as embeddings:
+                embeddings[0] = first
+                for row, emb in enumerate(vectors, start=1):
+                    embeddings[row] = emb
+        return self.store.load_embeddings(video, "clip", key)[0]
+
+    def _transcribe(self, video, key, audio_path):
+        cached = self.store.load_json(video, "transcript", key)
+        if cached is not None:
+            self.audio_proc.load_transcript(cached)
+            with self.trace.span("whisper_transcription", cached=True) as span:
+                self.audio_proc.extract_audio(self.video_path, audio_path)
+                span["segments"] = len(self.audio_proc.segments)
+            return
+        with self.trace.span("whisper_transcription") as span:
+            self.audio_proc.model = self.models.whisper_model()
+            self.audio_proc.extract_and_transcribe(self.video_path, audio_path)
+            span["segments"] = len(self.audio_proc.segments)
+        self.store.save_json(video, "transcript", key, self.audio_proc.transcript())
+
+    def _ranked_inputs(self, video, keys):
+        """Keyframes and their embeddings, loaded once per summarizer."""
+        if self._ranked is None:
+            keyframes = self._keyframes(video, keys["keyframes"])
+            embeddings = None
+            if keyframes:
+                embeddings = self._clip_embeddings(video, keys["clip"], keyframes)
+            self._ranked = (keyframes, embeddings)
+        return self._ranked
+
+    def _build_snippets(self, video, keys, snippet_root, scores=None):
+        keyframes, embeddings = self._ranked_inputs(video, keys)
+        if not keyframes:
+            print("[VideoSummarizer] No frames after dynamic extraction, aborting.")
+            return False
+        with self.trace.span("clip_scoring", frames=len(keyframes)):
+            if scores is None:
+                scores = prompt_scores(embeddings, self.prompt_emb)[:, 0]
+            keyframes = score_keyframes(keyframes, embeddings, scores=scores)
+        print(
+            "[VideoSummarizer] Sorted by clip_score. Top 5 =>",
+            [kf["clip_score"] for kf in keyframes[:5]],
+        )
+        with self.trace.span("diversity_skip", frames=len(keyframes)) as span:
+            final_list = diversity_skip(keyframes, threshold_dot=self.threshold_dot)
+            span["kept"] = len(final_list)
+        print(f"[VideoSummarizer] After diversity => {len(final_list)} frames")
+        final_list = final_list[: self.top_k]
+        print(
+            f"[VideoSummarizer] Taking top_k={self.top_k} => {len(final_list)} frames"
+        )
+        if self.owns_models and self._models is not None:
+            self._models.release_clip()
+        audio_path = os.path.join(snippet_root, "source_audio.wav")
+        self._transcribe(video, keys["transcript"], audio_path)
+        if os.path.exists(audio_path):
+            os.remove(audio_path)  # the decoded clip is kept in memory
+        self.frames_in_mem  # snippet writing needs the frames and fps
+        final_list.sort(key=lambda x: x["real_index"])
+        ranges = []
+        snippet_idx = 1
+        for kf in final_list:
+            with self.trace.span("snippet", index=snippet_idx):
+                real_idx = kf["real_index"]
+                start_temp = max(0, real_idx - 5)
+                end_temp = min(self.total_frames - 1, real_idx + 5)
+                snippet_temp = generate_snippet(
+                    self.frames_in_mem, start_temp, end_temp
+                )
+                local_mot = measure_local_motion_snippet(
+                    snippet_temp, resize_dim=self.resize_dim
+                )
+                if local_mot < 0.3:
+                    halfw = 7
+                elif local_mot < 0.7:
+                    halfw = 5
+                else:
+                    halfw = 3
+                startf = max(0, real_idx - halfw)
+                endf = min(self.total_frames - 1, real_idx + halfw)
+                if endf <= startf:
+                    print(
+                        f"[Snippet {snippet_idx}] Zero-len snippet => skip. real_idx={real_idx}"
+                    )
+                    continue
+                start_s = startf / self.fps
+                end_s = endf / self.fps
+                overlapping_segments = []
+                for seg in self.audio_proc.segments:
+                    seg_start = seg["start"]
+                    seg_end = seg["end"]
+                    if seg_end >= start_s and seg_start <= end_s:
+                        overlapping_segments.append(seg)
+                if overlapping_segments:
+                    final_seg_start = min(s["start"] for s in overlapping_segments)
+                    final_seg_end = max(s["end"] for s in overlapping_segments)
+                    startf = int(final_seg_start * self.fps)
+                    endf = int(final_seg_end * self.fps)
+                    startf = max(0, startf)
+                    endf = min(self.total_frames - 1, endf)
+                    if endf <= startf:
+                        print(
+                            f"[Snippet {snippet_idx}] After expansion, zero-len => skip. "
+                            f"real_idx={real_idx}"
+                        )
+                        continue
+                snippet_frames = generate_snippet(self.frames_in_mem, startf, endf)
+                final_mot = measure_local_motion_snippet(
+                    snippet_frames, resize_dim=self.resize_dim
+                )
+                frames_written = len(snippet_frames)
+                snippet_dir = os.path.join(snippet_root, f"snippet_{snippet_idx:03d}")
+                os.makedirs(snippet_dir, exist_ok=True)
+                out_vid_path = os.path.join(snippet_dir, "video.mp4")
+                write_snippet_video(
+                    out_vid_path, snippet_frames, self.fps, self.resize_dim
+                )
+                audio_clip = self.audio_proc.get_audio_snippet(startf, endf, self.fps)
+                audio_path = os.path.join(snippet_dir, "audio.wav")
+                if audio_clip:
+                    audio_clip.export(audio_path, format="wav")
+                snippet_start_s = float(startf / self.fps)
+                snippet_end_s = float(endf / self.fps)
+                local_words = []
+                for w in self.audio_proc.word_timestamps:
+                    w_start = w.get("start", 0.0)
+                    if snippet_start_s <= w_start < snippet_end_s:
+                        local_words.append(w)
+                local_segments = []
+                for seg in self.audio_proc.segments:
+                    if seg["end"] >= snippet_start_s and seg["start"] <= snippet_end_s:
+                        local_segments.append(seg)
+                meta = {
+                    "real_index": real_idx,
+                    "diff_score": kf["diff_score"],
+                    "clip_score": kf["clip_score"],
+                    "local_motion": final_mot,
+                    "snippet_start_frame": startf,
+                    "snippet_end_frame": endf,
+                    "snippet_start_s": snippet_start_s,
+                    "snippet_end_s": snippet_end_s,
+                    "frames_written": frames_written,
+                    "audio_words": local_words,
+                    "audio_segments": local_segments,
+                    "prompt": self.prompt,
+                    "artifact": {"video": video, "snippets": keys["snippets"]},
+                }
+                meta_path = os.path.join(snippet_dir, "metadata.json")
+                with open(meta_path, "w") as f:
+                    json.dump(meta, f, indent=2)
+                snippet_secs = frames_written / self.fps
+                print(
+                    f"[Snippet {snippet_idx:03d}] real_idx={real_idx}, "
+                    f"clip_score={kf['clip_score']:.2f}, local_mot={final_mot:.2f}, "
+                    f"frames={frames_written}, dur={snippet_secs:.2f}s"
+                )
+                ranges.append(
+                    {
+                        "snippet": snippet_idx,
+                        "real_index": real_idx,
+                        "start_frame": startf,
+                        "end_frame": endf,
+                    }
+                )
+                snippet_idx += 1
+        with open(os.path.join(snippet_root, "ranges.json"), "w") as f:
+            json.dump(ranges, f, indent=2)
+        return True
+
+
+# ============================
+# 12. Batch Processing
+# ============================
+DATASET_FOLDER = "/kaggle/input/bro123"
+PROCESSED_JSON = "/kaggle/working/processed_videos.json"
+SUMMARIES_DIR = "/kaggle/working/summaries"
+PROMPT = "Rank according to relevancy"
+TOP_K = 10
+RESIZE_DIM = (640, 360)
+# CLIP ViT-B/32 plus Whisper medium in fp32, and headroom for the frame copies
+# made while scoring and writing snippets.
+MODEL_MEMORY_MB = 4500
+
+_WORKER_MODELS = None
+
+
+def load_ledger(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return []
+
+
+def mark_processed(path, video_name):
+    """Adds a video to the ledger, replacing the file atomically."""
+    ledger = load_ledger(path)
+    if video_name not in ledger:
+        ledger.append(video_name)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)),
+        prefix=os.path.basename(path) + ".",
+        suffix=".tmp",
+    )
+    with os.fdopen(fd, "w") as f:
+        json.dump(ledger, f)
+    os.replace(tmp_path, path)
+    return ledger
+
+
+def pending_videos(dataset_folder, ledger_path):
+    processed = set(load_ledger(ledger_path))
+    video_files = sorted(
+        f for f in os.listdir(dataset_folder) if f.lower().endswith(".mp4")
+    )
+    return [f for f in video_files if f not in processed]
+
+
+def available_memory_mb():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES") / (1024 * 1024)
+
+
+def estimate_job_mb(video_path, resize_dim=RESIZE_DIM):
+    """Models plus every decoded frame, which load_entire_video keeps in memory."""
+    cap = cv2.VideoCapture(video_path)
+    frame_count = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+    cap.release()
+    frames_mb = frame_count * resize_dim[0] * resize_dim[1] * 3 / (1024 * 1024)
+    return MODEL_MEMORY_MB + frames_mb
+
+
+def batch_worker_count(video_paths, resize_dim=RESIZE_DIM, max_workers=None):
+    """
+    As many workers as there are cores, pending videos and room in memory
+    for the largest job running on every worker at once.
+    """
+    if not video_paths:
+        return 0
+    per_job_mb = max(estimate_job_mb(p, resize_dim) for p in video_paths)
+    by_memory = int(available_memory_mb() // per_job_mb)
+    workers = min(os.cpu_count() or 1, len(video_paths), max(by_memory, 1))
+    if max_workers:
+        workers = min(workers, max_workers)
+    return workers
+
+
+def summarize_to_dir(video_path, out_root, models, prompt=PROMPT, top_k=TOP_K):
+    """
+    Summarizes one video into <out_root>/<video name>/. The snippets are
+    written to a scratch directory that is renamed into place only after the
+    whole video succeeded, so a crash never leaves a half-written result.
+    """
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    final_dir = os.path.join(out_root, name)
+    os.makedirs(out_root, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=out_root, prefix=f".{name}.partial-")
+    trace = PipelineTrace(job=os.path.basename(video_path))
+    try:
+        summarizer = VideoSummarizer(
+            video_path,
+            prompt,
+            top_k=top_k,
+            resize_dim=RESIZE_DIM,
+            trace=trace,
+            models=models,
+            out_dir=work_dir,
+        )
+        snippet_dirs = summarizer.run()
+        del summarizer
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    if os.path.exists(final_dir):
+        stale_dir = f"{work_dir}.stale"
+        os.replace(final_dir, stale_dir)
+        os.replace(work_dir, final_dir)
+        shutil.rmtree(stale_dir, ignore_errors=True)
+    else:
+        os.replace(work_dir, final_dir)
+    return {
+        "video": os.path.basename(video_path),
+        "out_dir": final_dir,
+        "snippets": [os.path.basename(d) for d in snippet_dirs],
+    }
+
+
+def _init_worker(devices, threads, clip_backend):
+    import torch
+
+    global _WORKER_MODELS
+    torch.set_num_threads(threads)
+    _WORKER_MODELS = PipelineModels(
+        device=devices.get(), clip_backend=clip_backend, threads=threads
+    )
+
+
+def _summarize_in_worker(video_path, out_root, prompt, top_k):
+    return summarize_to_dir(video_path, out_root, _WORKER_MODELS, prompt, top_k)
+
+
+def run_batch(
+    dataset_folder=DATASET_FOLDER,
+    out_root=SUMMARIES_DIR,
+    ledger_path=PROCESSED_JSON,
+    prompt=PROMPT,
+    top_k=TOP_K,
+    max_workers=None,
+    clip_backend="torch",
+    threads=None,
+):
+    """
+    Summarizes every video not yet in the ledger. Each worker process loads
+    the models once; a video is added to the ledger as soon as its result is
+    in place, and failed videos stay pending for the next run.
+    """
+    os.makedirs(out_root, exist_ok=True)
+    names = pending_videos(dataset_folder, ledger_path)
+    paths = [os.path.join(dataset_folder, name) for name in names]
+    if not paths:
+        print("No new .mp4 files to process.")
+        return {"done": [], "failed": []}
+    workers = batch_worker_count(paths, max_workers=max_workers)
+
+    import torch
+
+    gpus = torch.cuda.device_count()
+    if gpus:
+        workers = min(workers, gpus)
+        devices = [f"cuda:{i}" for i in range(workers)]
+    else:
+        devices = ["cpu"] * workers
+    # Split the cores between workers instead of oversubscribing them.
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    print(f"[run_batch] {len(paths)} pending video(s), {workers} worker(s).")
+
+    done, failed = [], []
+
+    def record(path, get_result):
+        name = os.path.basename(path)
+        try:
+            result = get_result()
+        except Exception as e:
+            print(f"[run_batch] {name} failed: {e!r}")
+            failed.append(name)
+            return
+        mark_processed(ledger_path, name)
+        done.append(result)
+        print(f"[run_batch] {name} => {len(result['snippets'])} snippet(s)")
+
+    if workers == 1:
+        torch.set_num_threads(threads)
+        models = PipelineModels(
+            device=devices[0], clip_backend=clip_backend, threads=threads
+        )
+        for path in paths:
+            record(
+                path, lambda: summarize_to_dir(path, out_root, models, prompt, top_k)
+            )
+        return {"done": done, "failed": failed}
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    import multiprocessing
+
+    # CUDA cannot be re-initialized in a forked child.
+    ctx = multiprocessing.get_context("spawn")
+    device_queue = ctx.Queue()
+    for device in devices:
+        device_queue.put(device)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(device_queue, threads, clip_backend),
+    ) as pool:
+        futures = {
+            pool.submit(_summarize_in_worker, path, out_root, prompt, top_k): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            record(futures[future], future.result)
+    return {"done": done, "failed": failed}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize pending dataset videos.")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help=f"summarize every pending video into {SUMMARIES_DIR}/<name>/",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="cap on batch workers"
+    )
+    parser.add_argument("--dataset", default=DATASET_FOLDER)
+    parser.add_argument(
+        "--prompt",
+        action="append",
+        dest="prompts",
+        help="ranking prompt; repeat to summarize one video for several prompts",
+    )
+    parser.add_argument(
+        "--video",
+        help="summarize this video (e.g. again, for a new prompt) without touching the ledger",
+    )
+    parser.add_argument(
+        "--clip-backend",
+        choices=CLIP_BACKENDS,
+        default="torch",
+        help="fp32 PyTorch, or int8/ONNX Runtime on CPU",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=None, help="intra-op threads for CLIP"
+    )
+    parser.add_argument(
+        "--keyframes",
+        choices=("dynamic", "shots"),
+        default="dynamic",
+        help="frames sent to CLIP: every changed frame, or a few per detected shot",
+    )
+    parser.add_argument(
+        "--decode-workers",
+        type=int,
+        default=1,
+        help="processes decoding the video in parallel (single-video mode)",
+    )
+    args = parser.parse_args()
+    prompts = args.prompts or [PROMPT]
+
+    if args.batch:
+        if len(prompts) > 1:
+            parser.error("--batch takes a single --prompt")
+        outcome = run_batch(
+            dataset_folder=args.dataset,
+            prompt=prompts[0],
+            max_workers=args.workers,
+            clip_backend=args.clip_backend,
+            threads=args.threads,
+        )
+        print(
+            f"\nSummarized {len(outcome['done'])} video(s); "
+            f"{len(outcome['failed'])} failed and stay pending."
+        )
+        sys.exit(1 if outcome["failed"] else 0)
+
+    # Default: the next pending video, into /kaggle/working/snippets for the
+    # mPLUG cells of the notebook.
+    next_video = None
+    if args.video:
+        VIDEO_PATH = args.video
+    else:
+        new_videos = pending_videos(args.dataset, PROCESSED_JSON)
+        if not new_videos:
+            print("No new .mp4 files to process.")
+            sys.exit(0)
+        next_video = new_videos[0]
+        VIDEO_PATH = os.path.join(args.dataset, next_video)
+        print(f"Found new video to process: {next_video}")
+    print(f"VIDEO_PATH = {VIDEO_PATH}")
+    summarizer = VideoSummarizer(
+        video_path=VIDEO_PATH,
+        prompt=prompts[0],
+        top_k=TOP_K,
+        resize_dim=RESIZE_DIM,
+        clip_backend=args.clip_backend,
+        clip_threads=args.threads,
+        decode_workers=args.decode_workers,
+        keyframe_mode=args.keyframes,
+    )
+    if len(prompts) > 1:
+        # Frames are embedded once (or read back from the embedding store) and
+        # every prompt is ranked against them in one pass.
+        by_prompt = summarizer.run_prompts(prompts)
+    else:
+        by_prompt = {prompts[0]: summarizer.run()}
+    for prompt, snippet_dirs in by_prompt.items():
+        print(f"\n[{prompt}] Generated {len(snippet_dirs)} snippet(s):")
+        for d in snippet_dirs:
+            print(f"- {d}")
+    if next_video is not None:
+        # Only mark the video processed once its snippets exist.
+        mark_processed(PROCESSED_JSON, next_video)
+        print(f"Updated processed_videos.json with {next_video}.")
+    del summarizer
+    import gc
+    import torch
+
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    print("All models freed and memory cleared.")